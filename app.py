@@ -1,9 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.Controllers.chat_controller import router as chatbot_router
+from src.Controllers.chat_controller import router as chatbot_router, repository, session_expiry
+from src.Utils.config import SERVER_HOST, SERVER_PORT
+from src.Utils.model_loader import iniciar_precarga
+from src.Utils.PLN_utils import POOL_GENERATIVO, RECARGADOR_CATALOGO
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los modelos se cargan en segundo plano: las intenciones por plantilla
+    # responden desde el arranque y el fallback generativo al terminar la precarga
+    iniciar_precarga()
+    RECARGADOR_CATALOGO.start()
+    session_expiry.start()
+    yield
+    session_expiry.stop()
+    RECARGADOR_CATALOGO.stop()
+    POOL_GENERATIVO.stop()
+    repository.close()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="ChatBot Computex API",
     description="API RESTful para chatbot de ventas de computadoras con procesamiento NLP",
     version="1.0.0",
@@ -31,7 +49,10 @@ async def root():
             "chat": "/api/chatbot/chat (POST)",
             "analyze": "/api/chatbot/analyze (POST)",
             "health": "/api/chatbot/health (GET)",
+            "liveness": "/api/chatbot/health/live (GET)",
+            "readiness": "/api/chatbot/health/ready (GET)",
             "stats": "/api/chatbot/stats (GET)",
+            "metrics": "/api/chatbot/metrics (GET)",
             "docs": "/docs"
         }
     }
@@ -52,10 +73,10 @@ async def api_info():
     }
 
 if __name__ == "__main__":
+    # Desarrollo: un proceso con recarga automática. Producción: python serve.py
     uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        workers=1
+        "app:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        reload=True
     )
\ No newline at end of file
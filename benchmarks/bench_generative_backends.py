@@ -0,0 +1,98 @@
+"""
+Compara los backends del modelo generativo (fp32, int8 dinámico, ONNX Runtime).
+
+Cada backend se mide en un subproceso propio para que el RSS no se mezcle:
+
+    python -m benchmarks.bench_generative_backends
+    python -m benchmarks.bench_generative_backends --backends torch torch-int8 --runs 20
+
+Reporta tiempo de carga, latencia p50/p95 por generación, tokens/s y RSS máximo.
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from src.Utils.generative_backends import BACKENDS
+
+PROMPTS = [
+    "¿Cuál me recomiendas para estudiar?",
+    "Necesito algo liviano para viajar",
+    "¿Qué diferencia hay entre el XPS y el Envy?",
+    "Quiero editar video en casa",
+]
+
+
+def medir_backend(backend: str, runs: int, max_new_tokens: int) -> dict:
+    from src.Utils.config import GENERATIVE_MODEL
+    from src.Utils.generative_backends import construir_generador
+    from src.Utils.PLN_utils import _CATALOGO, construir_prefijo, construir_sufijo
+
+    inicio = time.perf_counter()
+    generador = construir_generador(backend, GENERATIVE_MODEL)
+    carga = time.perf_counter() - inicio
+    tokenizer = generador.tokenizer
+    prefijo = construir_prefijo(_CATALOGO.contexto)
+
+    latencias, tokens = [], 0
+    for i in range(runs + 1):
+        prompt = prefijo + construir_sufijo(PROMPTS[i % len(PROMPTS)])
+        inicio = time.perf_counter()
+        salida = generador(prompt, max_new_tokens=max_new_tokens, do_sample=False,
+                           return_full_text=False, pad_token_id=tokenizer.eos_token_id)
+        duracion = time.perf_counter() - inicio
+        if i == 0:
+            continue  # calentamiento
+        latencias.append(duracion)
+        tokens += len(tokenizer.encode(salida[0]["generated_text"]))
+
+    latencias.sort()
+    return {
+        "backend": backend,
+        "load_s": round(carga, 2),
+        "p50_ms": round(statistics.median(latencias) * 1000, 1),
+        "p95_ms": round(latencias[int(0.95 * (len(latencias) - 1))] * 1000, 1),
+        "tokens_per_s": round(tokens / sum(latencias), 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-new-tokens", type=int, default=50)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(medir_backend(args.child, args.runs, args.max_new_tokens)))
+        return
+
+    resultados = []
+    for backend in args.backends:
+        proceso = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_generative_backends", "--child", backend,
+             "--runs", str(args.runs), "--max-new-tokens", str(args.max_new_tokens)],
+            capture_output=True, text=True
+        )
+        if proceso.returncode != 0:
+            print(f"[{backend}] falló:\n{proceso.stderr.strip().splitlines()[-1] if proceso.stderr else ''}")
+            continue
+        resultados.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+    columnas = ["backend", "load_s", "p50_ms", "p95_ms", "tokens_per_s", "max_rss_mb"]
+    print(" | ".join(f"{c:>12}" for c in columnas))
+    base = next((r for r in resultados if r["backend"] == "torch"), None)
+    for r in resultados:
+        fila = " | ".join(f"{r[c]:>12}" for c in columnas)
+        if base and r is not base:
+            fila += f"   (x{base['p50_ms'] / r['p50_ms']:.2f} vs fp32)"
+        print(fila)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmarks de la ruta por plantilla sobre el corpus de mensajes en español
+(benchmarks/corpus.py): preprocesamiento, detección por keywords, extracción
+de presupuesto/specs, nivel semántico y la respuesta completa por plantilla
+(detección + render).
+
+    python -m benchmarks.bench_intents
+    python -m benchmarks.bench_intents --rounds 500
+
+Cada llamado se cronometra por separado; se reportan p50/p95 en µs y
+mensajes/s. No carga spaCy ni el modelo generativo.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.corpus import ESPECIFICACIONES, GENERATIVO, PLANTILLA, SEMANTICO
+from src.Models.chat_model import ConversationState
+from src.Utils.especificaciones import extraer_requisitos
+from src.Utils.PLN_utils import (
+    _responder_con_plantilla, detectar_intencion, detectar_intencion_semantica, preprocesar_mensaje
+)
+
+
+def cronometrar(funcion, mensajes, rondas: int) -> dict:
+    funcion(mensajes[0])  # calentamiento
+    tiempos = []
+    for _ in range(rondas):
+        for mensaje in mensajes:
+            inicio = time.perf_counter_ns()
+            funcion(mensaje)
+            tiempos.append(time.perf_counter_ns() - inicio)
+    tiempos.sort()
+    return {
+        "calls": len(tiempos),
+        "p50_us": round(statistics.median(tiempos) / 1000, 2),
+        "p95_us": round(tiempos[int(0.95 * (len(tiempos) - 1))] / 1000, 2),
+        "msgs_per_s": round(len(tiempos) / (sum(tiempos) / 1e9)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="pasadas sobre cada grupo del corpus")
+    args = parser.parse_args()
+
+    todos = PLANTILLA + ESPECIFICACIONES + SEMANTICO + GENERATIVO
+    # ConversationState guarda pocos turnos: reutilizarlo no acumula memoria
+    estado = ConversationState()
+    casos = {
+        "preprocess": (preprocesar_mensaje, todos),
+        "keyword_intent": (detectar_intencion, todos),
+        "spec_extraction": (extraer_requisitos, todos),
+        "semantic_intent": (detectar_intencion_semantica, SEMANTICO + GENERATIVO),
+        "template_response_keyword": (lambda m: _responder_con_plantilla(m, estado), PLANTILLA),
+        "template_response_spec": (lambda m: _responder_con_plantilla(m, estado), ESPECIFICACIONES),
+        "template_response_semantic": (lambda m: _responder_con_plantilla(m, estado), SEMANTICO),
+    }
+    print(json.dumps({nombre: cronometrar(funcion, mensajes, args.rounds)
+                      for nombre, (funcion, mensajes) in casos.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Prueba de carga en proceso contra la app FastAPI (httpx + ASGITransport, sin
+red ni servidor). Usuarios virtuales concurrentes, cada uno con su sesión,
+envían mensajes a POST /api/chatbot/chat según una mezcla de tráfico:
+
+- ``template``: solo intenciones con plantilla (keyword y semántico).
+- ``mixed``: 20% de mensajes que caen al fallback generativo.
+- ``fallback``: 80% de fallback generativo.
+
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --mix fallback --users 16 --requests 2000
+    python -m benchmarks.bench_load --backend torch-int8 --generative-cache
+
+Por defecto usa el backend ``stub`` (generador determinista, sin GPU ni
+descargas) y desactiva la caché generativa para que cada fallback llegue al
+pool. Reporta latencia p50/p95/p99, peticiones/s y RSS por mezcla.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+
+def _rss_mb() -> float:
+    """RSS actual (Linux); el máximo del proceso si no hay /proc"""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentil(ordenados, p: float) -> float:
+    return ordenados[int(p * (len(ordenados) - 1))]
+
+
+async def _usuario(cliente, sesion: str, mensajes, latencias: list, categorias: dict, errores: list):
+    for mensaje in mensajes:
+        inicio = time.perf_counter()
+        respuesta = await cliente.post("/api/chatbot/chat", json={"message": mensaje, "session_id": sesion})
+        latencias.append(time.perf_counter() - inicio)
+        if respuesta.status_code != 200:
+            errores.append(respuesta.status_code)
+            continue
+        categoria = respuesta.json()["category"]
+        categorias[categoria] = categorias.get(categoria, 0) + 1
+
+
+async def correr_mezcla(cliente, mezcla: str, usuarios: int, peticiones: int, semilla: int) -> dict:
+    from benchmarks.corpus import generar_trafico
+
+    por_usuario = max(1, peticiones // usuarios)
+    latencias, categorias, errores = [], {}, []
+    rss_inicio = _rss_mb()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(
+        _usuario(cliente, f"bench-{mezcla}-{u}", generar_trafico(mezcla, por_usuario, semilla + u),
+                 latencias, categorias, errores)
+        for u in range(usuarios)
+    ))
+    duracion = time.perf_counter() - inicio
+    latencias.sort()
+    generativas = categorias.get("fallback_generativo", 0)
+    return {
+        "mix": mezcla,
+        "requests": len(latencias),
+        "errors": len(errores),
+        "generative_pct": round(100 * generativas / max(1, len(latencias)), 1),
+        "p50_ms": round(statistics.median(latencias) * 1000, 2),
+        "p95_ms": round(_percentil(latencias, 0.95) * 1000, 2),
+        "p99_ms": round(_percentil(latencias, 0.99) * 1000, 2),
+        "req_per_s": round(len(latencias) / duracion, 1),
+        "rss_mb_start": round(rss_inicio, 1),
+        "rss_mb_end": round(_rss_mb(), 1),
+    }
+
+
+async def correr(args) -> dict:
+    import httpx
+    from app import app
+    from src.Utils.model_loader import cargar_modelo_generativo, estado_modelos
+
+    # El generador se carga antes de medir; la precarga del lifespan no debe
+    # competir por CPU con las peticiones
+    if cargar_modelo_generativo() is None:
+        raise SystemExit(f"No se pudo cargar el backend generativo '{args.backend}'")
+    resultados = []
+    async with app.router.lifespan_context(app):
+        limite = time.monotonic() + args.warmup_timeout
+        while not estado_modelos()["warmup_finished"] and time.monotonic() < limite:
+            await asyncio.sleep(0.1)
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            for mezcla in args.mix:
+                resultados.append(await correr_mezcla(cliente, mezcla, args.users, args.requests, args.seed))
+    return {
+        "backend": args.backend,
+        "users": args.users,
+        "results": resultados,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    from benchmarks.corpus import MEZCLAS
+    from src.Utils.generative_backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", nargs="+", choices=list(MEZCLAS), default=list(MEZCLAS))
+    parser.add_argument("--users", type=int, default=8, help="usuarios virtuales concurrentes")
+    parser.add_argument("--requests", type=int, default=800, help="peticiones por mezcla")
+    parser.add_argument("--backend", choices=BACKENDS, default="stub")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--generative-cache", action="store_true", help="mantener la caché de respuestas generativas")
+    parser.add_argument("--warmup-timeout", type=float, default=60.0, help="espera máxima (s) a la precarga")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # La configuración se lee al importar la app: se fija antes
+    os.environ["CHATBOT_GENERATIVE_BACKEND"] = args.backend
+    os.environ["CHATBOT_STORAGE"] = args.storage
+    if args.storage == "sqlite":
+        os.environ["CHATBOT_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-"), "chatbot.db")
+    if not args.generative_cache:
+        os.environ["CHATBOT_GENERATIVE_CACHE_SIZE"] = "0"
+    print(json.dumps(asyncio.run(correr(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Mide la memoria por mensaje del historial: el dict por mensaje con datetime
+(representación anterior) frente a MessageRecord con __slots__.
+
+    python -m benchmarks.bench_message_memory
+    python -m benchmarks.bench_message_memory --turns 200000
+
+Cada turno guarda el mensaje del usuario (texto propio) y la respuesta del bot
+(plantilla compartida, como en producción). Se cuenta con tracemalloc todo lo
+que queda vivo, incluidos los textos del usuario.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.Models.chat_model import MessageRecord
+
+RESPUESTAS = [
+    ("¡Hola! ¿En qué puedo ayudarte hoy? Tenemos Dell, HP y Lenovo.", "saludo", "hola"),
+    ("Nuestros precios van desde $600 hasta $1,800. ¿Qué presupuesto tienes?", "precio", "precio"),
+    ("Para gaming te recomiendo el Dell Alienware M15.", "gaming", "gaming"),
+]
+
+
+def _texto_usuario(i: int) -> str:
+    # Texto nuevo por turno, como llega en cada petición
+    return f"quiero una laptop para el trabajo numero {i}"
+
+
+def como_dict(i: int) -> list:
+    respuesta, categoria, keyword = RESPUESTAS[i % len(RESPUESTAS)]
+    return [
+        {"type": "user", "message": _texto_usuario(i), "timestamp": datetime.now(), "processing_time": 0.0004},
+        {"type": "bot", "message": respuesta, "category": categoria, "matched_keyword": keyword,
+         "timestamp": datetime.now(), "processing_time": 0.0004},
+    ]
+
+
+def como_record(i: int) -> list:
+    respuesta, categoria, keyword = RESPUESTAS[i % len(RESPUESTAS)]
+    ahora = time.time()
+    return [
+        MessageRecord("user", _texto_usuario(i), timestamp=ahora, processing_time=0.0004),
+        MessageRecord("bot", respuesta, categoria, keyword, ahora, 0.0004),
+    ]
+
+
+def medir(construir, turnos: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    historial = []
+    for i in range(turnos):
+        historial.extend(construir(i))
+    usado = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return usado / len(historial)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50000)
+    args = parser.parse_args()
+
+    antes = medir(como_dict, args.turns)
+    despues = medir(como_record, args.turns)
+    print(json.dumps({
+        "messages": args.turns * 2,
+        "dict_bytes_per_message": round(antes, 1),
+        "record_bytes_per_message": round(despues, 1),
+        "reduction_pct": round(100 * (1 - despues / antes), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Corpus de mensajes en español para los benchmarks, agrupado por el nivel que
+los responde: keyword (plantilla directa), especificaciones (presupuesto o
+specs, consulta al catálogo), semántico (paráfrasis, plantilla) y generativo
+(ninguna intención conocida: fallback a GPT-2).
+"""
+import random
+from typing import Dict, List
+
+PLANTILLA = [
+    "Hola, buenas tardes",
+    "hola que tal",
+    "¿Qué laptops tienen?",
+    "Quiero ver el catálogo completo",
+    "¿Cuánto cuesta la Dell XPS 13?",
+    "precio del HP Omen 16",
+    "Busco una laptop para gaming",
+    "necesito algo con RTX para jugar",
+    "Algo para la oficina, uso profesional",
+    "¿Qué tienen de HP?",
+    "muéstrame las Lenovo",
+    "Me interesa Dell",
+    "¿Tienen algo económico?",
+    "algo barato por favor",
+    "Quiero apartar la HP Envy 13",
+    "¿Puedo reservarlo?",
+    "¿Qué marcas manejan?",
+    "háblame del ThinkPad X1 Carbon",
+    "Gracias, eso es todo",
+    "ok perfecto, chao",
+]
+
+ESPECIFICACIONES = [
+    "tengo 1000 dólares",
+    "algo con 32GB",
+    "busco una laptop de menos de $900",
+    "entre 800 y 1200 dólares",
+    "una gaming de menos de 1600 dólares",
+    "quiero 16gb de ram y 1tb ssd",
+    "mi presupuesto es de 700",
+]
+
+SEMANTICO = [
+    "buenos días",
+    "algo para jugar",
+    "para videojuegos",
+    "para programar",
+    "para mi empresa",
+    "no tengo mucho dinero",
+    "la menos cara",
+    "cuánto sale",
+    "qué modelos tienen",
+    "me lo llevo",
+    "hasta luego",
+    "nos vemos",
+]
+
+GENERATIVO = [
+    "¿Cuál me recomiendas para estudiar diseño?",
+    "Necesito algo liviano para viajar",
+    "¿Qué diferencia hay entre el XPS y el Envy?",
+    "Quiero editar video en casa",
+    "¿Sirve para aprendizaje automático?",
+    "mi hija entra a la universidad el próximo mes",
+    "¿Tienen envío a Medellín?",
+    "¿Aceptan pagos a meses sin intereses?",
+    "la batería de mi equipo actual dura muy poco",
+    "¿Cuál aguanta mejor el calor?",
+    "¿Traen cargador incluido?",
+    "¿Cuál tiene mejor pantalla para ver películas?",
+]
+
+# Proporción de mensajes por nivel en cada mezcla de tráfico
+MEZCLAS: Dict[str, Dict[str, float]] = {
+    "template": {"plantilla": 0.6, "especificaciones": 0.2, "semantico": 0.2, "generativo": 0.0},
+    "mixed": {"plantilla": 0.45, "especificaciones": 0.15, "semantico": 0.2, "generativo": 0.2},
+    "fallback": {"plantilla": 0.05, "especificaciones": 0.05, "semantico": 0.1, "generativo": 0.8},
+}
+
+_GRUPOS = {"plantilla": PLANTILLA, "especificaciones": ESPECIFICACIONES, "semantico": SEMANTICO,
+           "generativo": GENERATIVO}
+
+
+def generar_trafico(mezcla: str, total: int, semilla: int = 42) -> List[str]:
+    """`total` mensajes con la proporción de la mezcla (reproducible por semilla)"""
+    pesos = MEZCLAS[mezcla]
+    azar = random.Random(semilla)
+    grupos = [g for g in _GRUPOS if pesos[g] > 0]
+    elegidos = azar.choices(grupos, weights=[pesos[g] for g in grupos], k=total)
+    return [azar.choice(_GRUPOS[grupo]) for grupo in elegidos]
@@ -0,0 +1,151 @@
+"""
+Punto de entrada de producción con varios workers (Linux/macOS).
+
+    python serve.py
+    python serve.py --workers 4 --port 8000
+
+El proceso maestro carga NLTK, spaCy y el modelo generativo una sola vez,
+congela el heap (gc.freeze) y recién entonces crea los workers con fork: los
+pesos quedan en páginas compartidas copy-on-write en lugar de una copia por
+worker. Todos aceptan conexiones del mismo socket. Cada worker importa la app
+después del fork, así que abre su propio repositorio, pool e hilos.
+
+Las sesiones van por defecto a SQLite (CHATBOT_STORAGE=sqlite), compartido
+entre workers, y sin escritura diferida (CHATBOT_WRITE_BEHIND=0): cada turno
+se escribe antes de responder. CHATBOT_STORAGE=memory sirve como sustituto
+local con un solo worker. Para desarrollo con recarga automática: python app.py
+"""
+import os
+
+# Antes de importar la configuración: el modo multi-worker necesita sesiones compartidas
+os.environ.setdefault("CHATBOT_STORAGE", "sqlite")
+# Sin escritura diferida: el siguiente turno de una sesión puede caer en otro
+# worker y debe ver ya el último modelo y los mensajes, en orden
+os.environ.setdefault("CHATBOT_WRITE_BEHIND", "0")
+# El tokenizer de HF no debe usar hilos propios antes del fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+import argparse
+import gc
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from src.Utils.config import SERVER_HOST, SERVER_PORT, SQLITE_PATH, STORAGE_BACKEND, TORCH_THREADS, WORKERS
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos que el proceso puede usar (respeta cgroups/affinity en contenedores)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def precargar():
+    """Todo lo que los workers comparten: modelos, catálogo compilado y esquema SQLite"""
+    from src.Utils.model_loader import estado_modelos, precargar_modelos
+    import src.Services.chat_service  # noqa: F401  (catálogo, clasificador semántico, cachés)
+
+    precargar_modelos()
+    errores = estado_modelos()["errors"]
+    if errores:
+        print(f"Precarga con errores: {errores}")
+    if STORAGE_BACKEND == "sqlite":
+        # Crear el esquema una vez evita que los workers compitan por el lock al arrancar
+        from src.Repositories.sqlite_repo import SQLiteChatbotRepository
+        SQLiteChatbotRepository(SQLITE_PATH).close()
+
+
+def abrir_socket(host: str, port: int) -> socket.socket:
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def ejecutar_worker(sock: socket.socket, hilos_torch: int):
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if "torch" in sys.modules:
+        # Sin esto cada worker usaría todos los núcleos y competirían entre sí
+        sys.modules["torch"].set_num_threads(hilos_torch)
+    config = uvicorn.Config("app:app", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def iniciar_worker(sock: socket.socket, hilos_torch: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        codigo = 0
+        try:
+            ejecutar_worker(sock, hilos_torch)
+        except BaseException as e:
+            print(f"Worker {os.getpid()} terminó con error: {e}")
+            codigo = 1
+        finally:
+            os._exit(codigo)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="0 = un worker por núcleo")
+    args = parser.parse_args()
+
+    nucleos = nucleos_disponibles()
+    workers = args.workers or nucleos
+    hilos_torch = TORCH_THREADS or max(1, nucleos // workers)
+    if workers > 1 and STORAGE_BACKEND == "memory":
+        print("Aviso: con CHATBOT_STORAGE=memory cada worker tiene sus propias sesiones")
+    if not hasattr(os, "fork") or workers == 1:
+        uvicorn.run("app:app", host=args.host, port=args.port)
+        return
+
+    # gc desactivado hasta el fork: una colección en el maestro tocaría (y
+    # copiaría) las páginas de todos los objetos que los workers comparten
+    gc.disable()
+    precargar()
+    gc.freeze()
+
+    sock = abrir_socket(args.host, args.port)
+    print(f"Maestro {os.getpid()}: {workers} workers en {args.host}:{args.port} "
+          f"({hilos_torch} hilos de torch por worker, sesiones en {STORAGE_BACKEND})")
+    pids = {iniciar_worker(sock, hilos_torch) for _ in range(workers)}
+    deteniendo = False
+
+    def detener(signum, frame):
+        nonlocal deteniendo
+        deteniendo = True
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, detener)
+    signal.signal(signal.SIGINT, detener)
+    while pids:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        pids.discard(pid)
+        if not deteniendo:
+            # Un worker que cae se reemplaza por otro, también forkeado del maestro
+            print(f"Worker {pid} terminó (estado {estado}); se inicia otro")
+            time.sleep(1)
+            pids.add(iniciar_worker(sock, hilos_torch))
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, status, BackgroundTasks
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Iterator, List, Optional
 from datetime import datetime, timedelta
+import json
 from src.Services.chat_service import ChatbotService
-from src.Repositories.chat_repo import ChatbotRepository
+from src.Services.session_expiry import SessionExpiryScheduler
+from src.Repositories.factory import create_repository
 from src.Models.chat_model import (
     ChatRequest, ChatResponse, ChatSession, NLPAnalysis, HealthCheck
 )
+from src.Utils.config import CHAT_BATCH_MAX, SESSION_EXPIRY_BATCH, SESSION_EXPIRY_INTERVAL, SESSION_TTL
+from src.Utils.metrics import METRICS
+from src.Utils.model_loader import estado_modelos
 
 router = APIRouter(prefix="/api/chatbot", tags=["chatbot"])
 
-# Inicializar repositorio y servicio
-repository = ChatbotRepository()
-chatbot_service = ChatbotService(repository)
+# Inicializar repositorio, expiración de sesiones y servicio
+repository = create_repository()
+session_expiry = SessionExpiryScheduler(
+    repository, SESSION_TTL, SESSION_EXPIRY_INTERVAL, SESSION_EXPIRY_BATCH
+)
+chatbot_service = ChatbotService(repository, expiry=session_expiry)
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_bot(chat_request: ChatRequest):
@@ -19,45 +29,118 @@ async def chat_with_bot(chat_request: ChatRequest):
     Envía un mensaje al chatbot y recibe una respuesta procesada con NLP
     """
     try:
-        return chatbot_service.process_message(chat_request)
+        # Fuera del event loop: el fallback generativo espera al pool del modelo
+        return await run_in_threadpool(chatbot_service.process_message, chat_request)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error procesando el mensaje: {str(e)}"
         )
 
+def _sse(events: Iterator[dict]) -> Iterator[str]:
+    for event in events:
+        name = event.pop("event")
+        yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(chat_request: ChatRequest):
+    """
+    Igual que /chat pero en Server-Sent Events: "meta", un "token" por fragmento y "done" al final
+    """
+    return StreamingResponse(
+        _sse(chatbot_service.process_message_stream(chat_request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/chat/batch", response_model=List[ChatResponse])
+async def chat_batch(chat_requests: List[ChatRequest]):
+    """
+    Procesa varios mensajes (de una o varias sesiones) en un solo llamado; respuestas en el mismo orden
+    """
+    if len(chat_requests) > CHAT_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote admite como máximo {CHAT_BATCH_MAX} mensajes"
+        )
+    try:
+        return await run_in_threadpool(chatbot_service.process_batch, chat_requests)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error procesando el lote: {str(e)}"
+        )
+
 @router.post("/analyze", response_model=NLPAnalysis)
 async def analyze_message(message: str):
     """
     Análisis detallado NLP de un mensaje (tokens, lemas, POS tags)
     """
     try:
-        return chatbot_service.analyze_message(message)
+        return await run_in_threadpool(chatbot_service.analyze_message, message)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en análisis NLP: {str(e)}"
         )
 
+@router.post("/analyze/batch", response_model=List[NLPAnalysis])
+async def analyze_batch(messages: List[str]):
+    """
+    Análisis NLP de varios mensajes con una sola pasada de spaCy (pln.pipe)
+    """
+    if len(messages) > CHAT_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote admite como máximo {CHAT_BATCH_MAX} mensajes"
+        )
+    try:
+        return await run_in_threadpool(chatbot_service.analyze_batch, messages)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en análisis NLP: {str(e)}"
+        )
+
+def _ndjson(items: Iterator[dict]) -> Iterator[str]:
+    for item in items:
+        yield json.dumps(item, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v),
+                         ensure_ascii=False) + "\n"
+
 @router.get("/history/{session_id}")
-async def get_chat_history(session_id: str):
+async def get_chat_history(session_id: str, limit: int = Query(100, ge=1, le=1000),
+                           before: Optional[int] = Query(None, ge=0), after: Optional[int] = Query(None, ge=0)):
     """
-    Obtiene el historial completo de una sesión de chat
+    Obtiene una página del historial de una sesión de chat (cursores por id de mensaje)
     """
-    history = chatbot_service.get_chat_history(session_id)
-    if not history:
+    page = await run_in_threadpool(chatbot_service.get_history_page, session_id, limit, before, after)
+    if page is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sesión no encontrada"
         )
-    return history
+    return page
+
+@router.get("/history/{session_id}/stream")
+async def stream_chat_history(session_id: str):
+    """
+    Historial completo en NDJSON (un mensaje por línea), leído por páginas
+    """
+    # Existencia con una página de un mensaje: no carga el historial
+    if await run_in_threadpool(repository.get_history_page, session_id, 1) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión no encontrada"
+        )
+    return StreamingResponse(_ndjson(repository.iter_history(session_id)),
+                             media_type="application/x-ndjson")
 
 @router.get("/session/{session_id}")
 async def get_session_info(session_id: str):
     """
     Obtiene información de una sesión específica
     """
-    session_info = chatbot_service.get_session_info(session_id)
+    session_info = await run_in_threadpool(chatbot_service.get_session_info, session_id)
     if not session_info:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,23 +148,33 @@ async def get_session_info(session_id: str):
         )
     return session_info
 
+def _active_since(active_only: bool) -> Optional[datetime]:
+    # Sesiones activas en las últimas 2 horas
+    return datetime.now() - timedelta(hours=2) if active_only else None
+
 @router.get("/sessions")
-async def get_all_sessions(active_only: bool = False):
-    """
-    Obtiene todas las sesiones (opcionalmente solo las activas)
-    """
-    sessions = repository.get_all_sessions()
-    if active_only:
-        # Sesiones activas en las últimas 2 horas
-        cutoff = datetime.now() - timedelta(hours=2)
-        sessions = [s for s in sessions if s.last_activity > cutoff]
-    
-    return [{
-        "session_id": s.session_id,
-        "message_count": len(s.messages),
-        "created_at": s.created_at,
-        "last_activity": s.last_activity
-    } for s in sessions]
+async def get_all_sessions(active_only: bool = False, limit: int = Query(100, ge=1, le=1000),
+                           after: Optional[str] = None):
+    """
+    Obtiene una página de sesiones (opcionalmente solo las activas); `next_cursor` pide la siguiente
+    """
+    try:
+        sessions, next_cursor = await run_in_threadpool(
+            repository.get_sessions_page, limit, after, _active_since(active_only))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+@router.get("/sessions/stream")
+async def stream_all_sessions(active_only: bool = False):
+    """
+    Todas las sesiones en NDJSON (una por línea), leídas por páginas
+    """
+    return StreamingResponse(_ndjson(repository.iter_sessions(active_since=_active_since(active_only))),
+                             media_type="application/x-ndjson")
 
 @router.get("/stats")
 async def get_statistics():
@@ -90,6 +183,13 @@ async def get_statistics():
     """
     return chatbot_service.get_stats()
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Histogramas de latencia por etapa en formato Prometheus
+    """
+    return METRICS.render_prometheus()
+
 @router.delete("/cleanup")
 async def cleanup_sessions(hours: int = 24, background_tasks: BackgroundTasks = None):
     """
@@ -102,27 +202,54 @@ async def cleanup_sessions(hours: int = 24, background_tasks: BackgroundTasks =
         chatbot_service.cleanup_sessions(hours)
         return {"message": f"Sesiones mayores a {hours} horas eliminadas"}
 
+def _build_health() -> HealthCheck:
+    models = estado_modelos()
+    # Las plantillas no dependen de ningún modelo: al terminar la precarga el
+    # servicio atiende aunque spaCy o el generador hayan fallado (degraded)
+    ready = models["warmup_finished"]
+    if not ready:
+        health_status = "warming_up"
+    elif models["errors"]:
+        health_status = "degraded"
+    else:
+        health_status = "ready"
+    return HealthCheck(
+        status=health_status,
+        live=True,
+        ready=ready,
+        nlp_models_loaded=models["nlp_loaded"],
+        generative_model_loaded=models["generative_loaded"],
+        warmup_finished=models["warmup_finished"],
+        errors=models["errors"],
+        timestamp=datetime.now()
+    )
+
 @router.get("/health", response_model=HealthCheck)
 async def health_check():
     """
-    Verifica el estado del servicio y modelos NLP
+    Verifica el estado del servicio: liveness y readiness de los modelos NLP
     """
-    try:
-        # Probar que los modelos NLP funcionan
-        test_message = "Hola"
-        analysis = chatbot_service.analyze_message(test_message)
-        
-        return HealthCheck(
-            status="healthy",
-            nlp_models_loaded=True,
-            timestamp=datetime.now()
-        )
-    except Exception as e:
-        return HealthCheck(
-            status="unhealthy",
-            nlp_models_loaded=False,
-            timestamp=datetime.now()
+    return _build_health()
+
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness: el proceso responde (las intenciones por plantilla ya funcionan)
+    """
+    return {"status": "alive", "timestamp": datetime.now()}
+
+@router.get("/health/ready", response_model=HealthCheck)
+async def readiness():
+    """
+    Readiness: la precarga terminó (503 mientras tanto); "degraded" si algún modelo falló
+    """
+    health = _build_health()
+    if not health.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=health.model_dump(mode="json")
         )
+    return health
 
 @router.get("/keywords")
 async def get_available_keywords():
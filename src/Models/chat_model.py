@@ -1,7 +1,10 @@
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from collections import deque
 from enum import Enum
 from datetime import datetime
+import sys
+import time
 
 class MessageType(str, Enum):
     USER = "user"
@@ -19,11 +22,87 @@ class ChatResponse(BaseModel):
     timestamp: datetime
     processing_time: float
 
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class MessageRecord:
+    """
+    Mensaje almacenado en el historial. Usa __slots__, interna los textos
+    repetidos (tipo, categoría, keyword) y guarda el timestamp como epoch;
+    se convierte a dict/JSON solo al salir por la API.
+    """
+    __slots__ = ("type", "message", "category", "matched_keyword", "timestamp", "processing_time")
+
+    def __init__(self, type: str, message: str, category: Optional[str] = None,
+                 matched_keyword: Optional[str] = None, timestamp: Optional[float] = None,
+                 processing_time: Optional[float] = None):
+        self.type = sys.intern(type)
+        self.message = message
+        self.category = _intern(category)
+        self.matched_keyword = _intern(matched_keyword)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.processing_time = processing_time
+
+    def to_dict(self, id: Optional[int] = None) -> dict:
+        data = {} if id is None else {"id": id}
+        data["type"] = self.type
+        data["message"] = self.message
+        if self.type == MessageType.BOT.value:
+            data["category"] = self.category
+            data["matched_keyword"] = self.matched_keyword
+        data["timestamp"] = datetime.fromtimestamp(self.timestamp)
+        data["processing_time"] = self.processing_time
+        return data
+
+def _to_datetime(epoch: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(epoch) if epoch is not None else None
+
 class ChatSession(BaseModel):
     session_id: str
     messages: list
     created_at: datetime
     last_activity: datetime
+    # Contadores incrementales: las consultas de la sesión no recorren messages
+    type_counts: Dict[str, int] = {}
+    category_counts: Dict[str, int] = {}
+    first_message_at: Optional[float] = None  # epoch
+    last_message_at: Optional[float] = None
+
+    def add_message(self, message: MessageRecord):
+        """Agrega un mensaje actualizando los contadores"""
+        self.messages.append(message)
+        self.type_counts[message.type] = self.type_counts.get(message.type, 0) + 1
+        if message.category is not None:
+            self.category_counts[message.category] = self.category_counts.get(message.category, 0) + 1
+        if self.first_message_at is None:
+            self.first_message_at = message.timestamp
+        self.last_message_at = message.timestamp
+
+    def summary(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "message_count": len(self.messages),
+            "created_at": self.created_at,
+            "last_activity": self.last_activity,
+            "user_messages": self.type_counts.get(MessageType.USER.value, 0),
+            "bot_messages": self.type_counts.get(MessageType.BOT.value, 0),
+            "categories": dict(self.category_counts),
+            "first_message_at": _to_datetime(self.first_message_at),
+            "last_message_at": _to_datetime(self.last_message_at)
+        }
+
+class ConversationState:
+    """Estado conversacional de una sesión: últimos turnos y último modelo mencionado"""
+    __slots__ = ("turns", "last_model")
+
+    def __init__(self, max_turns: int = 20):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.last_model: Optional[str] = None
+
+    def add_turn(self, role: str, content: str, model: Optional[str] = None):
+        self.turns.append({"role": role, "content": content})
+        if model:
+            self.last_model = model
 
 class NLPAnalysis(BaseModel):
     tokens: list[str]
@@ -33,5 +112,10 @@ class NLPAnalysis(BaseModel):
 
 class HealthCheck(BaseModel):
     status: str
+    live: bool = True
+    ready: bool = False
     nlp_models_loaded: bool
+    generative_model_loaded: bool = False
+    warmup_finished: bool = False
+    errors: Dict[str, str] = {}
     timestamp: datetime
\ No newline at end of file
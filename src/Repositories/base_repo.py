@@ -0,0 +1,96 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.Models.chat_model import ChatSession, ConversationState, MessageRecord
+
+class BaseChatRepository(ABC):
+    """Contrato común de los backends de almacenamiento de sesiones"""
+
+    @abstractmethod
+    def create_session(self) -> str: ...
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[ChatSession]: ...
+
+    @abstractmethod
+    def get_conversation(self, session_id: str) -> ConversationState: ...
+
+    def update_conversation(self, session_id: str, state: ConversationState):
+        """Persiste el estado conversacional (no hace falta si vive en memoria)"""
+
+    @abstractmethod
+    def save_message(self, session_id: str, message: MessageRecord): ...
+
+    def save_messages(self, session_id: str, messages: Iterable[MessageRecord]):
+        for message in messages:
+            self.save_message(session_id, message)
+
+    def save_batch(self, records: Iterable[Tuple[str, MessageRecord]]):
+        """Guarda mensajes de varias sesiones; (session_id, mensaje) en orden de llegada"""
+        for session_id, message in records:
+            self.save_message(session_id, message)
+
+    def get_session_info(self, session_id: str) -> Optional[dict]:
+        """Resumen de la sesión a partir de sus contadores incrementales"""
+        session = self.get_session(session_id)
+        return session.summary() if session else None
+
+    @abstractmethod
+    def get_chat_history(self, session_id: str) -> List[MessageRecord]: ...
+
+    @abstractmethod
+    def get_history_page(self, session_id: str, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> Optional[List[dict]]:
+        """
+        Página de mensajes en orden cronológico; cada mensaje incluye su "id"
+        (creciente dentro de la sesión). `after` devuelve los siguientes a ese
+        id, `before` los anteriores. None si la sesión no existe.
+        """
+
+    @abstractmethod
+    def get_sessions_page(self, limit: int = 100, after: Optional[str] = None,
+                          active_since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Resúmenes de sesiones en orden de creación y cursor opaco de la
+        siguiente página. ValueError si `after` no es un cursor válido.
+        """
+
+    def iter_history(self, session_id: str, chunk_size: int = 500) -> Iterator[dict]:
+        """Recorre todo el historial por páginas, con memoria acotada"""
+        after = None
+        while True:
+            page = self.get_history_page(session_id, chunk_size, after=after)
+            if not page:
+                return
+            yield from page
+            if len(page) < chunk_size:
+                return
+            after = page[-1]["id"]
+
+    def iter_sessions(self, chunk_size: int = 500, active_since: Optional[datetime] = None) -> Iterator[dict]:
+        after = None
+        while True:
+            page, after = self.get_sessions_page(chunk_size, after=after, active_since=active_since)
+            yield from page
+            if after is None:
+                return
+
+    @abstractmethod
+    def get_all_sessions(self) -> List[ChatSession]: ...
+
+    @abstractmethod
+    def expire_sessions(self, max_age: float, limit: Optional[int] = None) -> int:
+        """
+        Elimina hasta `limit` sesiones (todas si es None) sin actividad hace
+        más de `max_age` segundos, de la más antigua a la más reciente.
+        Devuelve cuántas eliminó.
+        """
+
+    def cleanup_old_sessions(self, hours: int = 24) -> int:
+        return self.expire_sessions(hours * 3600)
+
+    @abstractmethod
+    def get_stats(self) -> dict: ...
+
+    def close(self):
+        """Libera recursos del backend (conexiones, hilos)"""
@@ -1,69 +1,246 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import heapq
+import threading
+import time
 import uuid
+from bisect import bisect_right
+from collections import OrderedDict
 from datetime import datetime
-from src.Models.chat_model import ChatSession
+from src.Models.chat_model import ChatSession, ConversationState, MessageRecord
+from src.Repositories.base_repo import BaseChatRepository
+
+# Ventana para considerar una sesión como activa (segundos)
+ACTIVE_WINDOW_SECONDS = 3600
+
+class _Shard:
+    """Partición de sesiones protegida por su propio lock"""
+    __slots__ = ("lock", "sessions", "conversations")
 
-class ChatbotRepository:
     def __init__(self):
-        # Sesiones de chat en memoria
+        self.lock = threading.Lock()
         self.sessions: Dict[str, ChatSession] = {}
-        
+        self.conversations: Dict[str, ConversationState] = {}
+
+class ChatbotRepository(BaseChatRepository):
+    """
+    Repositorio en memoria seguro para hilos.
+
+    Las sesiones se reparten en particiones con locks independientes
+    (lock striping). Un índice ordenado por última actividad permite expirar
+    sesiones sin recorrer todas, y un registro con una entrada por sesión
+    activa mantiene el conteo de sesiones activas de forma incremental.
+    Orden de locks: partición -> actividad.
+    """
+
+    def __init__(self, shards: int = 16, active_window: float = ACTIVE_WINDOW_SECONDS):
+        # Sesiones de chat y estado conversacional, por partición
+        self._shards = [_Shard() for _ in range(shards)]
+
+        # Índice de actividad: session_id -> último instante (monotónico), del más antiguo al más reciente
+        self._activity_lock = threading.Lock()
+        self._by_activity: "OrderedDict[str, float]" = OrderedDict()
+        # Montículo (instante, session_id): una sola entrada por sesión activa,
+        # agregada al pasar de inactiva a activa y renovada al vencer si siguió activa
+        self._activity_log: List[Tuple[float, str]] = []
+        self._logged: set = set()
+        self._active_window = active_window
+        self._active_count = 0
+
+        # Orden de creación para paginar sesiones: secuencias crecientes, los huecos se compactan
+        self._seq = 0
+        self._seq_of: Dict[str, int] = {}
+        self._created_seqs: List[int] = []
+        self._created_ids: List[str] = []
+
         # Estadísticas
+        self._stats_lock = threading.Lock()
         self.message_count = 0
         self.categories_count = {}
 
-    def create_session(self) -> str:
-        session_id = str(uuid.uuid4())
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    # --- ÍNDICE DE ACTIVIDAD (llamar con _activity_lock tomado) ---
+    def _expire_active_window(self, now: float):
+        cutoff = now - self._active_window
+        log = self._activity_log
+        while log and log[0][0] < cutoff:
+            _, session_id = heapq.heappop(log)
+            last = self._by_activity.get(session_id)
+            if last is not None and last >= cutoff:
+                # Tuvo actividad después: la entrada se renueva con la última
+                heapq.heappush(log, (last, session_id))
+                continue
+            self._logged.discard(session_id)
+            if last is not None:
+                self._active_count -= 1
+
+    def _touch(self, session_id: str):
+        now = time.monotonic()
+        with self._activity_lock:
+            self._expire_active_window(now)
+            previous = self._by_activity.get(session_id)
+            if previous is None or previous < now - self._active_window:
+                self._active_count += 1
+            if previous is None:
+                self._seq += 1
+                self._seq_of[session_id] = self._seq
+                self._created_seqs.append(self._seq)
+                self._created_ids.append(session_id)
+            self._by_activity[session_id] = now
+            self._by_activity.move_to_end(session_id)
+            if session_id not in self._logged:
+                self._logged.add(session_id)
+                heapq.heappush(self._activity_log, (now, session_id))
+
+    def _new_session(self, shard: _Shard, session_id: str) -> ChatSession:
         now = datetime.now()
-        
-        self.sessions[session_id] = ChatSession(
+        session = shard.sessions[session_id] = ChatSession(
             session_id=session_id,
             messages=[],
             created_at=now,
             last_activity=now
         )
+        self._touch(session_id)
+        return session
+
+    # --- SESIONES ---
+    def create_session(self) -> str:
+        session_id = str(uuid.uuid4())
+        shard = self._shard(session_id)
+        with shard.lock:
+            self._new_session(shard, session_id)
         return session_id
 
     def get_session(self, session_id: str) -> Optional[ChatSession]:
-        return self.sessions.get(session_id)
-
-    def save_message(self, session_id: str, message: dict):
-        if session_id not in self.sessions:
-            self.create_session()
-        
-        session = self.sessions[session_id]
-        session.messages.append(message)
-        session.last_activity = datetime.now()
-        
+        return self._shard(session_id).sessions.get(session_id)
+
+    def get_conversation(self, session_id: str) -> ConversationState:
+        shard = self._shard(session_id)
+        state = shard.conversations.get(session_id)
+        if state is None:
+            with shard.lock:
+                state = shard.conversations.setdefault(session_id, ConversationState())
+        return state
+
+    def save_message(self, session_id: str, message: MessageRecord):
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                session = self._new_session(shard, session_id)
+            session.add_message(message)
+            session.last_activity = datetime.now()
+            self._touch(session_id)
+
         # Actualizar estadísticas
-        self.message_count += 1
-        category = message.get('category', 'unknown')
-        self.categories_count[category] = self.categories_count.get(category, 0) + 1
+        category = message.category or 'unknown'
+        with self._stats_lock:
+            self.message_count += 1
+            self.categories_count[category] = self.categories_count.get(category, 0) + 1
+
+    def get_chat_history(self, session_id: str) -> List[MessageRecord]:
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            return list(session.messages) if session else []
+
+    def get_history_page(self, session_id: str, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> Optional[List[dict]]:
+        # El id de cada mensaje es su posición en la sesión
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.get(session_id)
+            if session is None:
+                return None
+            if after is not None:
+                start = max(after + 1, 0)
+            elif before is not None:
+                start = max(min(before, len(session.messages)) - limit, 0)
+            else:
+                start = 0
+            end = start + limit
+            if before is not None:
+                end = max(min(end, before), 0)
+            page = session.messages[start:end]
+        return [message.to_dict(start + i) for i, message in enumerate(page)]
 
-    def get_chat_history(self, session_id: str) -> List[dict]:
-        session = self.get_session(session_id)
-        return session.messages if session else []
+    def _compact_created(self):
+        """Descarta los ids eliminados cuando son la mayoría (con _activity_lock tomado)"""
+        if len(self._created_ids) > 1024 and len(self._seq_of) < len(self._created_ids) // 2:
+            alive = [(seq, sid) for seq, sid in zip(self._created_seqs, self._created_ids)
+                     if self._seq_of.get(sid) == seq]
+            self._created_seqs = [seq for seq, _ in alive]
+            self._created_ids = [sid for _, sid in alive]
+
+    def get_sessions_page(self, limit: int = 100, after: Optional[str] = None,
+                          active_since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        # Cursor: número de secuencia de creación de la última sesión entregada
+        if after and not after.isdigit():
+            raise ValueError(f"Cursor inválido: '{after}'")
+        page: List[dict] = []
+        with self._activity_lock:
+            index = bisect_right(self._created_seqs, int(after)) if after else 0
+            seqs, ids = self._created_seqs, self._created_ids
+        last_seq = None
+        while index < len(ids) and len(page) < limit:
+            seq, session_id = seqs[index], ids[index]
+            index += 1
+            if self._seq_of.get(session_id) != seq:
+                continue  # eliminada
+            session = self.get_session(session_id)
+            if session is None or (active_since and session.last_activity < active_since):
+                continue
+            last_seq = seq
+            page.append(session.summary())
+        next_cursor = str(last_seq) if last_seq is not None and index < len(ids) else None
+        return page, next_cursor
 
     def get_all_sessions(self) -> List[ChatSession]:
-        return list(self.sessions.values())
+        sessions = []
+        for shard in self._shards:
+            with shard.lock:
+                sessions.extend(shard.sessions.values())
+        return sessions
 
-    def cleanup_old_sessions(self, hours: int = 24):
-        """Eliminar sesiones inactivas por más de X horas"""
-        now = datetime.now()
-        sessions_to_delete = []
-        
-        for session_id, session in self.sessions.items():
-            if (now - session.last_activity).total_seconds() > hours * 3600:
-                sessions_to_delete.append(session_id)
-        
-        for session_id in sessions_to_delete:
-            del self.sessions[session_id]
+    def expire_sessions(self, max_age: float, limit: Optional[int] = None) -> int:
+        """Recorre el índice de actividad desde la sesión más antigua: solo toca las expiradas"""
+        cutoff = time.monotonic() - max_age
+        deleted = 0
+        while limit is None or deleted < limit:
+            with self._activity_lock:
+                if not self._by_activity:
+                    break
+                session_id, stamp = next(iter(self._by_activity.items()))
+                if stamp >= cutoff:
+                    break
+
+            shard = self._shard(session_id)
+            with shard.lock:
+                with self._activity_lock:
+                    if self._by_activity.get(session_id) != stamp:
+                        continue  # tuvo actividad mientras tanto
+                    now = time.monotonic()
+                    self._expire_active_window(now)
+                    del self._by_activity[session_id]
+                    if stamp >= now - self._active_window:
+                        self._active_count -= 1
+                    self._seq_of.pop(session_id, None)
+                    self._compact_created()
+                shard.sessions.pop(session_id, None)
+                shard.conversations.pop(session_id, None)
+                deleted += 1
+        return deleted
 
     def get_stats(self) -> dict:
-        return {
-            "total_sessions": len(self.sessions),
-            "total_messages": self.message_count,
-            "categories_count": self.categories_count,
-            "active_sessions": len([s for s in self.sessions.values() 
-                                  if (datetime.now() - s.last_activity).total_seconds() < 3600])
-        }
\ No newline at end of file
+        with self._activity_lock:
+            self._expire_active_window(time.monotonic())
+            total_sessions = len(self._by_activity)
+            active_sessions = self._active_count
+        with self._stats_lock:
+            return {
+                "total_sessions": total_sessions,
+                "total_messages": self.message_count,
+                "categories_count": dict(self.categories_count),
+                "active_sessions": active_sessions
+            }
@@ -0,0 +1,23 @@
+from src.Repositories.base_repo import BaseChatRepository
+from src.Utils.config import (
+    STORAGE_BACKEND, SQLITE_CONVERSATION_CACHE, SQLITE_PATH, WRITE_BEHIND, WRITE_BEHIND_INTERVAL,
+    WRITE_BEHIND_MAX_BATCH, WRITE_BEHIND_MAX_QUEUE, WRITE_BEHIND_MAX_RETRIES
+)
+
+def _create_backend(backend: str) -> BaseChatRepository:
+    if backend == "memory":
+        from src.Repositories.chat_repo import ChatbotRepository
+        return ChatbotRepository()
+    if backend == "sqlite":
+        from src.Repositories.sqlite_repo import SQLiteChatbotRepository
+        return SQLiteChatbotRepository(SQLITE_PATH, max_conversations=SQLITE_CONVERSATION_CACHE)
+    raise ValueError(f"Backend de almacenamiento desconocido '{backend}'. Opciones: memory, sqlite")
+
+def create_repository(backend: str = STORAGE_BACKEND, write_behind: str = WRITE_BEHIND) -> BaseChatRepository:
+    """Crea el backend de sesiones configurado (memoria por defecto)"""
+    repository = _create_backend(backend)
+    if write_behind == "1" or (write_behind == "auto" and backend != "memory"):
+        from src.Repositories.write_behind import WriteBehindRepository
+        repository = WriteBehindRepository(repository, WRITE_BEHIND_INTERVAL, WRITE_BEHIND_MAX_BATCH,
+                                           WRITE_BEHIND_MAX_QUEUE, WRITE_BEHIND_MAX_RETRIES)
+    return repository
@@ -0,0 +1,402 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from src.Models.chat_model import ChatSession, ConversationState, MessageRecord
+from src.Repositories.base_repo import BaseChatRepository
+from src.Repositories.chat_repo import ACTIVE_WINDOW_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id       TEXT PRIMARY KEY,
+    created_at       REAL NOT NULL,
+    last_activity    REAL NOT NULL,
+    last_model       TEXT,
+    message_count    INTEGER NOT NULL DEFAULT 0,
+    first_message_at REAL,
+    last_message_at  REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions(last_activity);
+CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions(created_at, session_id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id      TEXT NOT NULL,
+    type            TEXT NOT NULL,
+    message         TEXT NOT NULL,
+    category        TEXT,
+    matched_keyword TEXT,
+    timestamp       REAL NOT NULL,
+    processing_time REAL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+
+CREATE TABLE IF NOT EXISTS category_counts (
+    category TEXT PRIMARY KEY,
+    count    INTEGER NOT NULL
+);
+
+-- Contadores incrementales por sesión ("type:user", "category:saludo")
+CREATE TABLE IF NOT EXISTS session_counts (
+    session_id TEXT NOT NULL,
+    counter    TEXT NOT NULL,
+    count      INTEGER NOT NULL,
+    PRIMARY KEY (session_id, counter)
+) WITHOUT ROWID;
+"""
+
+# Bases creadas antes de los contadores por sesión: columnas nuevas y relleno único
+_MIGRATE_SESSION_COUNTERS = """
+ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sessions ADD COLUMN first_message_at REAL;
+ALTER TABLE sessions ADD COLUMN last_message_at REAL;
+UPDATE sessions SET
+    message_count = (SELECT COUNT(*) FROM messages m WHERE m.session_id = sessions.session_id),
+    first_message_at = (SELECT timestamp FROM messages m WHERE m.session_id = sessions.session_id ORDER BY id LIMIT 1),
+    last_message_at = (SELECT timestamp FROM messages m WHERE m.session_id = sessions.session_id ORDER BY id DESC LIMIT 1);
+INSERT OR REPLACE INTO session_counts (session_id, counter, count)
+    SELECT session_id, 'type:' || type, COUNT(*) FROM messages GROUP BY session_id, type;
+INSERT OR REPLACE INTO session_counts (session_id, counter, count)
+    SELECT session_id, 'category:' || category, COUNT(*) FROM messages
+    WHERE category IS NOT NULL GROUP BY session_id, category;
+"""
+
+# Sentencias fijas: sqlite3 las mantiene preparadas en su caché por conexión
+_INSERT_SESSION = "INSERT OR IGNORE INTO sessions (session_id, created_at, last_activity) VALUES (?, ?, ?)"
+_TOUCH_SESSION = (
+    "UPDATE sessions SET last_activity = ?, message_count = message_count + ?, "
+    "first_message_at = COALESCE(first_message_at, ?), last_message_at = ? WHERE session_id = ?"
+)
+_COUNT_SESSION = (
+    "INSERT INTO session_counts (session_id, counter, count) VALUES (?, ?, ?) "
+    "ON CONFLICT(session_id, counter) DO UPDATE SET count = count + excluded.count"
+)
+_INSERT_MESSAGE = (
+    "INSERT INTO messages (session_id, type, message, category, matched_keyword, timestamp, processing_time) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_COUNT_CATEGORY = (
+    "INSERT INTO category_counts (category, count) VALUES (?, ?) "
+    "ON CONFLICT(category) DO UPDATE SET count = count + excluded.count"
+)
+_SELECT_SESSION = "SELECT session_id, created_at, last_activity FROM sessions WHERE session_id = ?"
+_SELECT_MESSAGES = (
+    "SELECT type, message, category, matched_keyword, timestamp, processing_time "
+    "FROM messages WHERE session_id = ? ORDER BY id"
+)
+_PAGE_COLUMNS = "SELECT id, type, message, category, matched_keyword, timestamp, processing_time FROM messages "
+_SELECT_PAGE = _PAGE_COLUMNS + "WHERE session_id = ? ORDER BY id LIMIT ?"
+_SELECT_PAGE_AFTER = _PAGE_COLUMNS + "WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?"
+_SELECT_PAGE_BEFORE = _PAGE_COLUMNS + "WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+_SESSION_SUMMARY = (
+    "SELECT s.session_id, s.created_at, s.last_activity, s.message_count "
+    "FROM sessions s WHERE (s.created_at, s.session_id) > (?, ?) AND s.last_activity >= ? "
+    "ORDER BY s.created_at, s.session_id LIMIT ?"
+)
+_SELECT_SESSION_COUNTERS = (
+    "SELECT created_at, last_activity, message_count, first_message_at, last_message_at "
+    "FROM sessions WHERE session_id = ?"
+)
+_SESSION_COUNTS = "SELECT counter, count FROM session_counts WHERE session_id = ?"
+_SELECT_LAST_MODEL = "SELECT last_model FROM sessions WHERE session_id = ?"
+_UPSERT_LAST_MODEL = (
+    "INSERT INTO sessions (session_id, created_at, last_activity, last_model) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET last_model = excluded.last_model"
+)
+
+
+def _row_to_message(row) -> MessageRecord:
+    return MessageRecord(row[0], row[1], row[2], row[3], row[4], row[5])
+
+
+def _parse_sessions_cursor(after: str) -> Tuple[float, str]:
+    """Cursor "created_at|session_id" de get_sessions_page; ValueError si está mal formado"""
+    created, sep, session_id = after.partition("|")
+    try:
+        if sep and session_id:
+            return float(created), session_id
+    except ValueError:
+        pass
+    raise ValueError(f"Cursor inválido: '{after}'")
+
+
+class SQLiteChatbotRepository(BaseChatRepository):
+    """
+    Almacenamiento de sesiones en SQLite con WAL.
+
+    Cada hilo usa su propia conexión; las escrituras de un proceso se
+    serializan con un lock y se agrupan en una sola transacción por lote.
+    Varios workers pueden compartir el mismo archivo: WAL permite lectores
+    concurrentes con un escritor. Los turnos de cada conversación viven en
+    una caché LRU del proceso (hasta `max_conversations`); el último modelo
+    se persiste en la tabla sessions y se relee en cada turno, porque otro
+    worker pudo cambiarlo.
+    """
+
+    def __init__(self, path: str = "chatbot.db", active_window: float = ACTIVE_WINDOW_SECONDS,
+                 max_conversations: int = 10000):
+        self.path = path
+        self._active_window = active_window
+        self._max_conversations = max(1, max_conversations)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._conversations: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._persisted_models: Dict[str, Optional[str]] = {}
+        self._conversations_lock = threading.Lock()
+        self._conn().executescript(_SCHEMA)
+        self._migrate()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None,
+                                   cached_statements=64, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=OFF")
+            self._local.conn = conn
+            with self._write_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _migrate(self):
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+                if "message_count" not in columns:
+                    for statement in _MIGRATE_SESSION_COUNTERS.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write(self, statements):
+        """Ejecuta [(sql, params | [params])] en una sola transacción"""
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params, many in statements:
+                    if many:
+                        conn.executemany(sql, params)
+                    else:
+                        conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    # --- SESIONES ---
+    def create_session(self) -> str:
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        self._write([(_INSERT_SESSION, (session_id, now, now), False)])
+        return session_id
+
+    def get_session(self, session_id: str) -> Optional[ChatSession]:
+        conn = self._conn()
+        row = conn.execute(_SELECT_SESSION, (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = ChatSession(
+            session_id=row[0],
+            messages=[],
+            created_at=datetime.fromtimestamp(row[1]),
+            last_activity=datetime.fromtimestamp(row[2])
+        )
+        for r in conn.execute(_SELECT_MESSAGES, (session_id,)):
+            session.add_message(_row_to_message(r))
+        return session
+
+    def get_session_info(self, session_id: str) -> Optional[dict]:
+        # Contadores mantenidos por save_batch: no depende del largo de la sesión
+        conn = self._conn()
+        row = conn.execute(_SELECT_SESSION_COUNTERS, (session_id,)).fetchone()
+        if row is None:
+            return None
+        created_at, last_activity, message_count, first_message_at, last_message_at = row
+        session = ChatSession(
+            session_id=session_id,
+            messages=[],
+            created_at=datetime.fromtimestamp(created_at),
+            last_activity=datetime.fromtimestamp(last_activity),
+            first_message_at=first_message_at,
+            last_message_at=last_message_at
+        )
+        for counter, count in conn.execute(_SESSION_COUNTS, (session_id,)):
+            kind, _, key = counter.partition(":")
+            (session.type_counts if kind == "type" else session.category_counts)[key] = count
+        info = session.summary()
+        info["message_count"] = message_count
+        return info
+
+    def get_conversation(self, session_id: str) -> ConversationState:
+        # Búsqueda por clave primaria: la tabla sessions manda sobre la caché
+        row = self._conn().execute(_SELECT_LAST_MODEL, (session_id,)).fetchone()
+        with self._conversations_lock:
+            state = self._conversations.get(session_id)
+            if state is None:
+                state = self._conversations[session_id] = ConversationState()
+                while len(self._conversations) > self._max_conversations:
+                    evicted, _ = self._conversations.popitem(last=False)
+                    self._persisted_models.pop(evicted, None)
+            else:
+                self._conversations.move_to_end(session_id)
+            state.last_model = row[0] if row else None
+            self._persisted_models[session_id] = state.last_model
+        return state
+
+    def update_conversation(self, session_id: str, state: ConversationState):
+        if self._persisted_models.get(session_id) == state.last_model:
+            return
+        now = time.time()
+        self._write([(_UPSERT_LAST_MODEL, (session_id, now, now, state.last_model), False)])
+        self._persisted_models[session_id] = state.last_model
+
+    def save_message(self, session_id: str, message: MessageRecord):
+        self.save_messages(session_id, [message])
+
+    def save_messages(self, session_id: str, messages: Iterable[MessageRecord]):
+        self.save_batch((session_id, message) for message in messages)
+
+    def save_batch(self, records: Iterable[Tuple[str, MessageRecord]]):
+        """Todos los mensajes del lote en una sola transacción, con los contadores de cada sesión"""
+        rows, categories = [], {}
+        sessions: Dict[str, list] = {}  # session_id -> [mensajes, primero, último]
+        counters: Dict[Tuple[str, str], int] = {}
+        for session_id, message in records:
+            rows.append((
+                session_id,
+                message.type,
+                message.message,
+                message.category,
+                message.matched_keyword,
+                message.timestamp,
+                message.processing_time,
+            ))
+            category = message.category or 'unknown'
+            categories[category] = categories.get(category, 0) + 1
+            totals = sessions.setdefault(session_id, [0, message.timestamp, None])
+            totals[0] += 1
+            totals[2] = message.timestamp
+            keys = [f"type:{message.type}"]
+            if message.category is not None:
+                keys.append(f"category:{message.category}")
+            for key in keys:
+                counters[(session_id, key)] = counters.get((session_id, key), 0) + 1
+        if not rows:
+            return
+        now = time.time()
+        self._write([
+            (_INSERT_SESSION, [(session_id, now, now) for session_id in sessions], True),
+            (_INSERT_MESSAGE, rows, True),
+            (_TOUCH_SESSION, [(now, count, first, last, session_id)
+                              for session_id, (count, first, last) in sessions.items()], True),
+            (_COUNT_SESSION, [(session_id, key, count) for (session_id, key), count in counters.items()], True),
+            (_COUNT_CATEGORY, list(categories.items()), True),
+        ])
+
+    def get_chat_history(self, session_id: str) -> List[MessageRecord]:
+        return [_row_to_message(r) for r in self._conn().execute(_SELECT_MESSAGES, (session_id,))]
+
+    def get_history_page(self, session_id: str, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> Optional[List[dict]]:
+        # El cursor es el id autoincremental de la tabla messages
+        conn = self._conn()
+        if conn.execute(_SELECT_SESSION, (session_id,)).fetchone() is None:
+            return None
+        if after is not None:
+            rows = conn.execute(_SELECT_PAGE_AFTER, (session_id, after, limit)).fetchall()
+        elif before is not None:
+            rows = conn.execute(_SELECT_PAGE_BEFORE, (session_id, before, limit)).fetchall()[::-1]
+        else:
+            rows = conn.execute(_SELECT_PAGE, (session_id, limit)).fetchall()
+        return [_row_to_message(row[1:]).to_dict(row[0]) for row in rows]
+
+    def get_sessions_page(self, limit: int = 100, after: Optional[str] = None,
+                          active_since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        # Cursor "created_at|session_id": recorre el índice idx_sessions_created sin OFFSET
+        created, last_id = _parse_sessions_cursor(after) if after else (-1.0, "")
+        since = active_since.timestamp() if active_since else 0.0
+        rows = self._conn().execute(_SESSION_SUMMARY, (created, last_id, since, limit + 1)).fetchall()
+        page = [{
+            "session_id": session_id,
+            "message_count": count,
+            "created_at": datetime.fromtimestamp(created_at),
+            "last_activity": datetime.fromtimestamp(last_activity)
+        } for session_id, created_at, last_activity, count in rows[:limit]]
+        next_cursor = f"{rows[limit - 1][1]!r}|{rows[limit - 1][0]}" if len(rows) > limit else None
+        return page, next_cursor
+
+    def get_all_sessions(self) -> List[ChatSession]:
+        conn = self._conn()
+        sessions: Dict[str, ChatSession] = {}
+        for session_id, created_at, last_activity in conn.execute(
+                "SELECT session_id, created_at, last_activity FROM sessions ORDER BY last_activity"):
+            sessions[session_id] = ChatSession(
+                session_id=session_id,
+                messages=[],
+                created_at=datetime.fromtimestamp(created_at),
+                last_activity=datetime.fromtimestamp(last_activity)
+            )
+        for row in conn.execute(
+                "SELECT session_id, type, message, category, matched_keyword, timestamp, processing_time "
+                "FROM messages ORDER BY id"):
+            session = sessions.get(row[0])
+            if session is not None:
+                session.add_message(_row_to_message(row[1:]))
+        return list(sessions.values())
+
+    def expire_sessions(self, max_age: float, limit: Optional[int] = None) -> int:
+        """Rango ordenado sobre el índice de last_activity; con `limit`, un lote acotado por transacción"""
+        cutoff = time.time() - max_age
+        expired = [r[0] for r in self._conn().execute(
+            "SELECT session_id FROM sessions WHERE last_activity < ? ORDER BY last_activity LIMIT ?",
+            (cutoff, -1 if limit is None else limit))]
+        if not expired:
+            return 0
+        self._write([
+            # Otro worker pudo registrar actividad después de la consulta: esas sesiones se conservan
+            ("DELETE FROM sessions WHERE session_id = ? AND last_activity < ?",
+             [(session_id, cutoff) for session_id in expired], True),
+            ("DELETE FROM messages WHERE session_id = ? AND NOT EXISTS "
+             "(SELECT 1 FROM sessions WHERE sessions.session_id = messages.session_id)",
+             [(session_id,) for session_id in expired], True),
+            ("DELETE FROM session_counts WHERE session_id = ? AND NOT EXISTS "
+             "(SELECT 1 FROM sessions WHERE sessions.session_id = session_counts.session_id)",
+             [(session_id,) for session_id in expired], True),
+        ])
+        with self._conversations_lock:
+            for session_id in expired:
+                self._conversations.pop(session_id, None)
+                self._persisted_models.pop(session_id, None)
+        return len(expired)
+
+    def get_stats(self) -> dict:
+        conn = self._conn()
+        cutoff = time.time() - self._active_window
+        total_sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        active_sessions = conn.execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_activity >= ?", (cutoff,)).fetchone()[0]
+        categories = dict(conn.execute("SELECT category, count FROM category_counts"))
+        return {
+            "total_sessions": total_sessions,
+            "total_messages": sum(categories.values()),
+            "categories_count": categories,
+            "active_sessions": active_sessions
+        }
+
+    def close(self):
+        with self._write_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,245 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from src.Models.chat_model import ChatSession, ConversationState, MessageRecord
+from src.Repositories.base_repo import BaseChatRepository
+from src.Utils.metrics import METRICS
+
+_SIN_PENDIENTE = object()
+
+class WriteBehindRepository(BaseChatRepository):
+    """
+    Cola de escritura diferida delante de otro repositorio.
+
+    save_message y update_conversation encolan y vuelven de inmediato; un
+    hilo vacía la cola en lotes cada `interval` segundos o cuando alcanza
+    `max_batch` mensajes. Las lecturas de una sesión combinan lo persistido
+    con lo pendiente, así cada sesión ve sus propias escrituras.
+
+    La cola admite hasta `max_queue` mensajes: al llenarse, quien escribe
+    vacía la cola él mismo (contrapresión sobre la petición). Un lote que
+    falla `max_retries` veces seguidas se descarta y se cuenta en la métrica
+    write_behind_dropped. close() vacía lo pendiente.
+    """
+
+    def __init__(self, backend: BaseChatRepository, interval: float = 0.5, max_batch: int = 256,
+                 max_queue: int = 10000, max_retries: int = 5):
+        self.backend = backend
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_queue = max(max_batch, max_queue)
+        self.max_retries = max(1, max_retries)
+        self._queue: deque = deque()  # (session_id, mensaje) en orden de llegada
+        self._pending: Dict[str, List[MessageRecord]] = {}
+        # Último modelo pendiente de persistir por sesión (se coalesce entre vaciados)
+        self._pending_models: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._failures = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # --- COLA ---
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error vaciando la cola de escritura: {e}")
+
+    def flush(self) -> int:
+        """
+        Persiste lo encolado hasta ahora; devuelve cuántos mensajes escribió.
+        Si el backend falla, el lote queda en la cola y se relanza el error,
+        salvo en el intento `max_retries`, en que el lote se descarta.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._queue)
+                models = dict(self._pending_models)
+            if not batch and not models:
+                return 0
+            start = time.perf_counter()
+            try:
+                if batch:
+                    self.backend.save_batch(batch)
+                for session_id, last_model in models.items():
+                    state = ConversationState()
+                    state.last_model = last_model
+                    self.backend.update_conversation(session_id, state)
+            except Exception as e:
+                self._failures += 1
+                METRICS.increment("write_behind_errors")
+                if self._failures < self.max_retries:
+                    raise
+                print(f"Lote de escritura descartado tras {self._failures} intentos "
+                      f"({len(batch)} mensajes): {e}")
+                METRICS.increment("write_behind_dropped", len(batch))
+                self.dropped += len(batch)
+                written = 0
+            else:
+                METRICS.observe("write_behind_flush", time.perf_counter() - start)
+                METRICS.increment("write_behind_flushed", len(batch))
+                written = len(batch)
+            self._failures = 0
+            with self._lock:
+                for _ in range(len(batch)):
+                    session_id, _ = self._queue.popleft()
+                    pending = self._pending.get(session_id)
+                    if pending:
+                        pending.pop(0)
+                        if not pending:
+                            del self._pending[session_id]
+                for session_id, last_model in models.items():
+                    # Si llegó otro turno durante el vaciado, su modelo sigue pendiente
+                    if self._pending_models.get(session_id, last_model) == last_model:
+                        self._pending_models.pop(session_id, None)
+                METRICS.set_gauge("write_behind_queue_depth", len(self._queue))
+            return written
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def _pending_for(self, session_id: str) -> List[MessageRecord]:
+        with self._lock:
+            return list(self._pending.get(session_id, ()))
+
+    # --- ESCRITURAS ---
+    def save_message(self, session_id: str, message: MessageRecord):
+        self.save_messages(session_id, [message])
+
+    def save_messages(self, session_id: str, messages: Iterable[MessageRecord]):
+        self.save_batch((session_id, message) for message in messages)
+
+    def save_batch(self, records: Iterable[Tuple[str, MessageRecord]]):
+        records = list(records)
+        if len(self._queue) + len(records) > self.max_queue:
+            # Cola llena: el backend no da abasto y la petición espera su vaciado
+            METRICS.increment("write_behind_backpressure")
+            self.flush()
+        with self._lock:
+            for session_id, message in records:
+                self._queue.append((session_id, message))
+                self._pending.setdefault(session_id, []).append(message)
+            depth = len(self._queue)
+        METRICS.set_gauge("write_behind_queue_depth", depth)
+        if depth >= self.max_batch:
+            self._wakeup.set()
+
+    def create_session(self) -> str:
+        return self.backend.create_session()
+
+    def get_conversation(self, session_id: str) -> ConversationState:
+        # Lo pendiente se lee antes que el backend: si un vaciado termina en
+        # medio, el backend ya tiene ese mismo modelo
+        with self._lock:
+            pending = self._pending_models.get(session_id, _SIN_PENDIENTE)
+        state = self.backend.get_conversation(session_id)
+        if pending is not _SIN_PENDIENTE:
+            state.last_model = pending
+        return state
+
+    def update_conversation(self, session_id: str, state: ConversationState):
+        with self._lock:
+            self._pending_models[session_id] = state.last_model
+
+    def expire_sessions(self, max_age: float, limit: Optional[int] = None) -> int:
+        self.flush()
+        return self.backend.expire_sessions(max_age, limit)
+
+    # --- LECTURAS (ven sus propias escrituras pendientes) ---
+    def get_session(self, session_id: str) -> Optional[ChatSession]:
+        # Con el lock de vaciado, un mensaje no puede estar a la vez pendiente y persistido
+        with self._flush_lock:
+            pending = self._pending_for(session_id)
+            session = self.backend.get_session(session_id)
+        if not pending:
+            return session
+        if session is None:
+            session = ChatSession(
+                session_id=session_id,
+                messages=[],
+                created_at=datetime.fromtimestamp(pending[0].timestamp),
+                last_activity=datetime.fromtimestamp(pending[-1].timestamp)
+            )
+        else:
+            session = session.model_copy(update={
+                "messages": list(session.messages),
+                "type_counts": dict(session.type_counts),
+                "category_counts": dict(session.category_counts),
+                "last_activity": datetime.fromtimestamp(pending[-1].timestamp)
+            })
+        for message in pending:
+            session.add_message(message)
+        return session
+
+    def get_session_info(self, session_id: str) -> Optional[dict]:
+        # Suma lo pendiente a los contadores del backend en vez de vaciar la cola
+        with self._flush_lock:
+            pending = self._pending_for(session_id)
+            info = self.backend.get_session_info(session_id)
+        if not pending:
+            return info
+        session = ChatSession(
+            session_id=session_id,
+            messages=[],
+            created_at=datetime.fromtimestamp(pending[0].timestamp),
+            last_activity=datetime.fromtimestamp(pending[-1].timestamp)
+        )
+        for message in pending:
+            session.add_message(message)
+        if info is None:
+            return session.summary()
+        extra = session.summary()
+        categories = dict(info["categories"])
+        for category, count in extra["categories"].items():
+            categories[category] = categories.get(category, 0) + count
+        info.update(
+            message_count=info["message_count"] + extra["message_count"],
+            user_messages=info["user_messages"] + extra["user_messages"],
+            bot_messages=info["bot_messages"] + extra["bot_messages"],
+            categories=categories,
+            last_activity=extra["last_activity"],
+            first_message_at=info["first_message_at"] or extra["first_message_at"],
+            last_message_at=extra["last_message_at"]
+        )
+        return info
+
+    def get_chat_history(self, session_id: str) -> List[MessageRecord]:
+        with self._flush_lock:
+            return self.backend.get_chat_history(session_id) + self._pending_for(session_id)
+
+    def get_history_page(self, session_id: str, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> Optional[List[dict]]:
+        # Los cursores son ids del backend: lo pendiente se persiste antes de paginar
+        self.flush()
+        return self.backend.get_history_page(session_id, limit, before, after)
+
+    def get_sessions_page(self, limit: int = 100, after: Optional[str] = None,
+                          active_since: Optional[datetime] = None) -> Tuple[List[dict], Optional[str]]:
+        self.flush()
+        return self.backend.get_sessions_page(limit, after, active_since)
+
+    def get_all_sessions(self) -> List[ChatSession]:
+        self.flush()
+        return self.backend.get_all_sessions()
+
+    def get_stats(self) -> dict:
+        stats = self.backend.get_stats()
+        stats["pending_writes"] = len(self._queue)
+        stats["dropped_writes"] = self.dropped
+        return stats
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self.backend.close()
@@ -1,75 +1,176 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 import time
-from src.Repositories.chat_repo import ChatbotRepository
-from src.Models.chat_model import ChatRequest, ChatResponse, NLPAnalysis
-from src.Utils.PLN_utils import response_chat
+from src.Repositories.base_repo import BaseChatRepository
+from src.Models.chat_model import ChatRequest, ChatResponse, MessageRecord, NLPAnalysis
+from src.Services.session_expiry import SessionExpiryScheduler
+from src.Utils.PLN_utils import (
+    response_chat, response_chat_lote, response_chat_stream, estado_catalogo, CACHE_GENERATIVA
+)
+from src.Utils.analisis import CACHE_ANALISIS, analizar_lote, analizar_texto
+from src.Utils.metrics import METRICS
 
 class ChatbotService:
-    def __init__(self, repository: ChatbotRepository):
+    def __init__(self, repository: BaseChatRepository, expiry: Optional[SessionExpiryScheduler] = None):
         self.repository = repository
+        self.expiry = expiry
 
     def process_message(self, chat_request: ChatRequest) -> ChatResponse:
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Obtener o crear session_id
         session_id = chat_request.session_id or self.repository.create_session()
         
         # Procesar el mensaje con NLP
-        nlp_result = response_chat(chat_request.message)
+        conversation = self.repository.get_conversation(session_id)
+        nlp_result = response_chat(chat_request.message, conversation)
         
         # Calcular tiempo de procesamiento
-        processing_time = time.time() - start_time
-        
-        # Guardar mensaje del usuario en el historial
-        user_message = {
-            "type": "user",
-            "message": chat_request.message,
-            "timestamp": datetime.now(),
-            "processing_time": processing_time
-        }
-        self.repository.save_message(session_id, user_message)
-        
-        # Guardar respuesta del bot
-        bot_response = {
-            "type": "bot",
-            "message": nlp_result["response"],
-            "category": nlp_result["category"],
-            "matched_keyword": nlp_result.get("matched_keyword"),
-            "timestamp": datetime.now(),
-            "processing_time": processing_time
-        }
-        self.repository.save_message(session_id, bot_response)
+        processing_time = time.perf_counter() - start_time
         
+        # Mensaje del usuario y respuesta del bot para el historial
+        now = time.time()
+        records = self._turn_records(chat_request.message, nlp_result, now, processing_time)
+
+        # Guardar ambos turnos en el repositorio
+        with METRICS.timer("repository_write"):
+            self.repository.save_messages(session_id, records)
+            self.repository.update_conversation(session_id, conversation)
+
+        # El tiempo total incluye la escritura en el repositorio
+        total_time = time.perf_counter() - start_time
+        METRICS.observe("request_total", total_time)
+
+        return self._build_response(session_id, nlp_result, now, total_time)
+
+    def process_message_stream(self, chat_request: ChatRequest) -> Iterator[dict]:
+        """
+        Eventos de una respuesta en streaming: "meta" (sesión y categoría),
+        "token" por cada fragmento y "done" con la respuesta completa, que se
+        guarda en el repositorio igual que en process_message.
+        """
+        start_time = time.perf_counter()
+        session_id = chat_request.session_id or self.repository.create_session()
+        conversation = self.repository.get_conversation(session_id)
+        nlp_result, fragments = response_chat_stream(chat_request.message, conversation)
+        yield {"event": "meta", "session_id": session_id, "category": nlp_result["category"],
+               "matched_keyword": nlp_result.get("matched_keyword")}
+        for fragment in fragments:
+            yield {"event": "token", "text": fragment}
+        processing_time = time.perf_counter() - start_time
+
+        now = time.time()
+        records = self._turn_records(chat_request.message, nlp_result, now, processing_time)
+        with METRICS.timer("repository_write"):
+            self.repository.save_messages(session_id, records)
+            self.repository.update_conversation(session_id, conversation)
+
+        total_time = time.perf_counter() - start_time
+        METRICS.observe("request_total", total_time)
+        response = self._build_response(session_id, nlp_result, now, total_time)
+        yield {"event": "done", **response.model_dump(mode="json")}
+
+    def process_batch(self, chat_requests: List[ChatRequest]) -> List[ChatResponse]:
+        """
+        Procesa varios mensajes (de una o varias sesiones) con una sola pasada
+        de NLP, los fallbacks generativos agrupados y una sola escritura en el
+        repositorio. Las respuestas mantienen el orden de entrada.
+        """
+        start_time = time.perf_counter()
+
+        session_ids = [r.session_id or self.repository.create_session() for r in chat_requests]
+        conversations = {sid: self.repository.get_conversation(sid) for sid in dict.fromkeys(session_ids)}
+        nlp_results = response_chat_lote([(r.message, conversations[sid])
+                                          for r, sid in zip(chat_requests, session_ids)])
+        processing_time = time.perf_counter() - start_time
+
+        now = time.time()
+        records = []
+        for chat_request, session_id, nlp_result in zip(chat_requests, session_ids, nlp_results):
+            records.extend((session_id, record) for record in
+                           self._turn_records(chat_request.message, nlp_result, now, processing_time))
+
+        with METRICS.timer("repository_write"):
+            self.repository.save_batch(records)
+            for session_id, conversation in conversations.items():
+                self.repository.update_conversation(session_id, conversation)
+
+        total_time = time.perf_counter() - start_time
+        METRICS.observe("batch_total", total_time)
+        METRICS.increment("batch_messages", len(chat_requests))
+
+        return [self._build_response(session_id, nlp_result, now, total_time)
+                for session_id, nlp_result in zip(session_ids, nlp_results)]
+
+    @staticmethod
+    def _turn_records(message: str, nlp_result: dict, now: float, processing_time: float) -> List[MessageRecord]:
+        return [
+            MessageRecord("user", message, timestamp=now, processing_time=processing_time),
+            MessageRecord("bot", nlp_result["response"], nlp_result["category"],
+                          nlp_result.get("matched_keyword"), now, processing_time),
+        ]
+
+    @staticmethod
+    def _build_response(session_id: str, nlp_result: dict, now: float, total_time: float) -> ChatResponse:
         return ChatResponse(
             response=nlp_result["response"],
             session_id=session_id,
             category=nlp_result["category"],
             matched_keyword=nlp_result.get("matched_keyword"),
-            timestamp=datetime.now(),
-            processing_time=processing_time
+            timestamp=datetime.fromtimestamp(now),
+            processing_time=total_time
         )
 
-    
+
+    def analyze_message(self, message: str) -> NLPAnalysis:
+        return analizar_texto(message)
+
+    def analyze_batch(self, messages: List[str]) -> List[NLPAnalysis]:
+        return analizar_lote(messages)
 
     def get_chat_history(self, session_id: str) -> List[dict]:
-        return self.repository.get_chat_history(session_id)
+        return [message.to_dict() for message in self.repository.get_chat_history(session_id)]
+
+    def get_history_page(self, session_id: str, limit: int = 100,
+                         before: Optional[int] = None, after: Optional[int] = None) -> Optional[dict]:
+        # Se pide un mensaje de más para saber si quedan páginas en esa dirección
+        page = self.repository.get_history_page(session_id, limit + 1, before=before, after=after)
+        if page is None:
+            return None
+        has_more = len(page) > limit
+        if has_more:
+            page = page[1:] if before is not None and after is None else page[:limit]
+        return {
+            "session_id": session_id,
+            "messages": page,
+            "next_cursor": page[-1]["id"] if page else None,
+            "prev_cursor": page[0]["id"] if page else None,
+            "has_more": has_more
+        }
 
     def get_session_info(self, session_id: str) -> Optional[dict]:
-        session = self.repository.get_session(session_id)
-        if session:
-            return {
-                "session_id": session.session_id,
-                "message_count": len(session.messages),
-                "created_at": session.created_at,
-                "last_activity": session.last_activity,
-                "user_messages": len([m for m in session.messages if m["type"] == "user"]),
-                "bot_messages": len([m for m in session.messages if m["type"] == "bot"])
-            }
-        return None
+        return self.repository.get_session_info(session_id)
 
     def get_stats(self) -> dict:
-        return self.repository.get_stats()
+        stats = self.repository.get_stats()
+        stats["latency"] = METRICS.snapshot()
+        stats["events"] = METRICS.counters_snapshot()
+        stats["gauges"] = METRICS.gauges_snapshot()
+        stats["generative_cache"] = CACHE_GENERATIVA.stats()
+        stats["analysis_cache"] = CACHE_ANALISIS.stats()
+        stats["intent_tiers"] = self._intent_tiers(stats["events"])
+        stats["catalog"] = estado_catalogo()
+        if self.expiry is not None:
+            stats["session_expiry"] = self.expiry.stats()
+        return stats
+
+    @staticmethod
+    def _intent_tiers(events: Dict[str, int]) -> dict:
+        """Mensajes resueltos por keywords, por presupuesto/specs, por similitud semántica o por GPT-2"""
+        hits = {tier: events.get(f"intent_tier_{tier}", 0) for tier in ("keyword", "spec", "semantic", "generative")}
+        total = sum(hits.values())
+        return {tier: {"hits": count, "hit_rate": round(count / total, 4) if total else None}
+                for tier, count in hits.items()}
 
     def cleanup_sessions(self, hours: int = 24):
         self.repository.cleanup_old_sessions(hours)
\ No newline at end of file
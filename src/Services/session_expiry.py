@@ -0,0 +1,80 @@
+from typing import Optional
+import threading
+import time
+from src.Repositories.base_repo import BaseChatRepository
+from src.Utils.metrics import METRICS
+
+class SessionExpiryScheduler:
+    """
+    Expira sesiones inactivas en segundo plano, en lotes acotados.
+
+    Cada ciclo pide al repositorio hasta `batch_size` sesiones con más de
+    `ttl` segundos sin actividad, recorriendo su índice por última actividad
+    desde la más antigua. Si el lote salió lleno queda más trabajo y el
+    siguiente ciclo corre tras `busy_interval`; si no, tras `interval`. Entre
+    lotes los locks quedan libres para las peticiones.
+    """
+
+    def __init__(self, repository: BaseChatRepository, ttl: float, interval: float = 30.0,
+                 batch_size: int = 256, busy_interval: float = 0.05):
+        self.repository = repository
+        self.ttl = ttl
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.busy_interval = busy_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.evicted = 0
+        self.runs = 0
+        self.errors = 0
+        self.last_run: Optional[float] = None
+        self.last_evicted = 0
+
+    def run_once(self) -> int:
+        """Un lote de expiración; devuelve cuántas sesiones eliminó"""
+        with METRICS.timer("session_expiry"):
+            evicted = self.repository.expire_sessions(self.ttl, self.batch_size)
+        self.runs += 1
+        self.evicted += evicted
+        self.last_evicted = evicted
+        self.last_run = time.time()
+        if evicted:
+            METRICS.increment("sessions_expired", evicted)
+        return evicted
+
+    def _run(self):
+        wait = self.interval
+        while not self._stop.wait(wait):
+            try:
+                wait = self.busy_interval if self.run_once() >= self.batch_size else self.interval
+            except Exception as e:
+                print(f"Error expirando sesiones: {e}")
+                self.errors += 1
+                METRICS.increment("session_expiry_errors")
+                wait = self.interval
+
+    def start(self):
+        if self.ttl <= 0 or self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="expiracion-sesiones", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._thread is not None,
+            "ttl_seconds": self.ttl,
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "evicted_total": self.evicted,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_evicted": self.last_evicted,
+            "last_run": self.last_run,
+        }
@@ -1,62 +1,37 @@
-import nltk
-from nltk.tokenize import word_tokenize
-import spacy
-from functools import lru_cache
-import re
+import queue
 import random
-from transformers import pipeline, set_seed
-
-
-# --- DESCARGAS Y CARGA DE MODELOS ---
-try:
-    nltk.download('punkt_tab', quiet=True)
-except:
-    nltk.download('punkt', quiet=True)
-
-try:
-    pln = spacy.load("es_core_news_sm")
-except:
-    import subprocess, sys
-    subprocess.check_call([sys.executable, "-m", "spacy", "download", "es_core_news_sm"])
-    pln = spacy.load("es_core_news_sm")
-
-# --- CARGA DEL MODELO GENERATIVO (CACHÉ) ---
-@lru_cache(maxsize=1)
-def cargar_modelo_generativo():
-    try:
-        generator = pipeline('text-generation', model='datificate/gpt2-small-spanish')
-        set_seed(42)
-        return generator
-    except Exception as e:
-        print(f"Error al cargar modelo: {e}")
-        return None
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeout
+from functools import lru_cache
+from src.Models.chat_model import ConversationState
+from src.Utils.metrics import METRICS
+from src.Utils.model_loader import obtener_generador, obtener_pln_si_listo, soporta_cache_prefijo, usa_transformers
+from src.Utils.generative_pool import GenerativePool
+from src.Utils.cache import LRUTTLCache
+from src.Utils.catalogo import CatalogoCompilado, RecargadorCatalogo, buscar_en_tokens, leer_catalogo
+from src.Utils.especificaciones import extraer_requisitos
+from src.Utils.texto import tokenizar
+from src.Utils.prefix_cache import PrefixKVCache
+from src.Utils.semantica import ClasificadorSemantico
+from src.Utils.streaming import FIN_ORACION, FragmentadorRespuesta, StreamerTokens, criterios_fin_oracion
+from src.Utils.config import (
+    GENERATIVE_QUEUE_SIZE, GENERATIVE_MAX_BATCH, GENERATIVE_BATCH_WINDOW,
+    GENERATIVE_TIMEOUT, GENERATIVE_MAX_NEW_TOKENS, GENERATIVE_PREFIX_CACHE, GENERATIVE_BULK_BATCH,
+    GENERATIVE_CACHE_SIZE, GENERATIVE_CACHE_TTL, GENERATIVE_CACHE_LEMMATIZE, INTENT_LEMMATIZE,
+    SEMANTIC_THRESHOLD, CATALOG_PATH, CATALOG_RELOAD_INTERVAL
+)
 
-GENERATOR = cargar_modelo_generativo()
 
 # --- CATÁLOGO DE PRODUCTOS ---
-CATALOGO = {
-    "dell": {
-        "Dell Inspiron 15": {"precio": 800, "ram": "16GB", "storage": "512GB SSD"},
-        "Dell XPS 13": {"precio": 1200, "ram": "16GB", "storage": "1TB SSD", "extra": "pantalla 4K"},
-        "Dell Alienware M15": {"precio": 1800, "ram": "32GB", "storage": "1TB SSD", "extra": "RTX 3070"}
-    },
-    "hp": {
-        "HP Pavilion": {"precio": 600, "ram": "8GB", "storage": "1TB HDD"},
-        "HP Envy 13": {"precio": 950, "ram": "16GB", "storage": "512GB SSD", "extra": "pantalla táctil"},
-        "HP Omen 16": {"precio": 1500, "ram": "32GB", "storage": "1TB SSD", "extra": "RTX 3060"}
-    },
-    "lenovo": {
-        "Lenovo ThinkPad X1 Carbon": {"precio": 1200, "ram": "32GB", "storage": "1TB SSD"},
-        "Lenovo IdeaPad 5": {"precio": 700, "ram": "8GB", "storage": "512GB SSD"},
-        "Lenovo Legion 5 Pro": {"precio": 1600, "ram": "32GB", "storage": "1TB SSD", "extra": "RTX 3070"}
-    }
-}
+# Se lee de CATALOG_PATH (data/catalogo.json) y se recarga cuando cambia el archivo
+CATALOGO = leer_catalogo(CATALOG_PATH)
 
 # --- TEMPLATES DE RESPUESTAS ---
 RESPONSE_TEMPLATES = {
     "saludo": [
         "¡Hola! Bienvenido a nuestra tienda de laptops. ¿Qué tipo de equipo buscas?",
-        "¡Hola! ¿En qué puedo ayudarte hoy? Tenemos Dell, HP y Lenovo.",
+        "¡Hola! ¿En qué puedo ayudarte hoy? Tenemos {marcas}.",
         "¡Buenas! Aquí estoy para ayudarte a elegir la laptop perfecta. ¿Qué necesitas?"
     ],
     "despedida": [
@@ -64,206 +39,251 @@ RESPONSE_TEMPLATES = {
         "¡De nada! No dudes en volver si tienes más dudas.",
         "¡Hasta pronto! Espero haberte ayudado."
     ],
-    "marca_general": "Trabajamos con **Dell** (profesional), **HP** (calidad-precio) y **Lenovo** (gaming y trabajo). ¿Cuál te interesa?",
-    "precio_general": "Nuestros precios van desde **$600** (básicos) hasta **$1,800** (gaming). ¿Qué presupuesto tienes?",
-    "catalogo_completo": """
-**Dell:**
-• Dell Inspiron 15: $800 - 16GB RAM, 512GB SSD
-• Dell XPS 13: $1,200 - 16GB RAM, 1TB SSD, 4K
-• Dell Alienware M15: $1,800 - 32GB RAM, RTX 3070
-
-**HP:**
-• HP Pavilion: $600 - 8GB RAM, 1TB HDD
-• HP Envy 13: $950 - 16GB RAM, 512GB SSD, táctil
-• HP Omen 16: $1,500 - 32GB RAM, RTX 3060
-
-**Lenovo:**
-• Lenovo ThinkPad X1: $1,200 - 32GB RAM, 1TB SSD
-• Lenovo IdeaPad 5: $700 - 8GB RAM, 512GB SSD
-• Lenovo Legion 5 Pro: $1,600 - 32GB RAM, RTX 3070
-"""
+    # "marca_general", "catalogo_completo" y "precio_general" se generan desde el catálogo compilado;
+    # en los saludos, {marcas} son las marcas del catálogo
+}
+
+# --- PALABRAS CLAVE POR INTENCIÓN (en orden de prioridad) ---
+# Después de estas se prueba una intención por cada marca del catálogo (su clave)
+INTENCIONES_KEYWORDS = [
+    ("saludo", "hola", ["hola", "buenas", "hey", "saludos", "qué tal"]),
+    ("despedida", "gracias", ["gracias", "adiós", "chao", "perfecto", "ok"]),
+    ("gaming", "gaming", ["gaming", "juegos", "gamer", "rtx", "gráficos"]),
+    ("trabajo", "trabajo", ["trabajo", "oficina", "profesional", "negocios"]),
+    ("barato", "barato", ["barato", "económico", "accesible", "bajo presupuesto"]),
+    ("precio", "precio", ["precio", "cuánto cuesta", "cuánto vale", "costo"]),
+    ("catalogo", "catalogo", ["catálogo", "catalogo", "opciones", "qué tienen", "ver todo", "laptop", "laptops", "computadora", "computadoras"]),
+    ("marca", "marca", ["marca", "marcas", "fabricante"]),
+    ("apartar", "apartar", ["apartar", "reservar", "comprar"]),
+]
+
+# Flexiones que cuentan como la keyword ("reservarlo" -> "reservar"). Se listan
+# a mano: una regla genérica confunde sustantivos ("costo" -> "costa")
+FLEXIONES_KEYWORDS = {
+    "barato": ["barata", "baratos", "baratas"],
+    "económico": ["económica", "económicos", "económicas"],
+    "accesible": ["accesibles"],
+    "precio": ["precios"],
+    "costo": ["costos"],
+    "profesional": ["profesionales"],
+    "oficina": ["oficinas"],
+    "gamer": ["gamers"],
+    "catálogo": ["catálogos"],
+    "fabricante": ["fabricantes"],
+    "perfecto": ["perfecta"],
+    "apartar": ["apartarlo", "apartarla", "apartarlos", "apartarlas", "aparta", "apártalo", "apártala",
+                "apártamelo", "apártamela"],
+    "reservar": ["reservarlo", "reservarla", "reservarlos", "reservarlas", "reserva", "resérvalo",
+                 "resérvala", "resérvamelo", "resérvamela"],
+    "comprar": ["comprarlo", "comprarla", "comprarlos", "comprarlas", "compra", "cómpralo", "cómprala"],
 }
 
+# --- FRASES DE EJEMPLO POR INTENCIÓN (nivel semántico) ---
+# Paráfrasis que no contienen las keywords; se comparan por similitud coseno
+INTENCIONES_EJEMPLOS = {
+    "saludo": ["hola", "buenos días", "buenas tardes", "buenas noches", "qué onda", "hey qué tal"],
+    "despedida": ["muchas gracias", "adiós", "hasta luego", "nos vemos", "eso es todo", "te agradezco"],
+    "gaming": ["algo para jugar", "para videojuegos", "quiero jugar juegos pesados", "una laptop gamer",
+               "con buena tarjeta gráfica", "para jugar fortnite"],
+    "trabajo": ["para la oficina", "para trabajar", "uso profesional", "para programar",
+                "para mi empresa", "para editar documentos"],
+    "barato": ["la más barata", "algo económico", "no tengo mucho dinero", "poco presupuesto",
+               "lo más barato posible", "la menos cara"],
+    "precio": ["cuánto cuesta", "qué precio tiene", "cuánto sale", "cuánto vale", "cuánto cobran"],
+    "catalogo": ["qué modelos tienen", "muéstrame todo", "qué equipos venden", "lista de productos",
+                 "qué tienen disponible"],
+    "marca": ["qué marcas manejan", "de qué fabricante son", "qué marcas venden"],
+    "apartar": ["lo quiero", "me lo llevo", "quiero comprarla", "sepáramelo", "apártalo", "hacer un pedido"],
+}
+CLASIFICADOR_SEMANTICO = ClasificadorSemantico(INTENCIONES_EJEMPLOS)
+
+# --- CATÁLOGO COMPILADO ---
+_CATALOGO = CatalogoCompilado(CATALOGO, palabras_clave=INTENCIONES_KEYWORDS, flexiones=FLEXIONES_KEYWORDS)
+CATALOGO_VERSION = _CATALOGO.version
+RESPONSE_TEMPLATES["catalogo_completo"] = _CATALOGO.catalogo_completo
+RESPONSE_TEMPLATES["precio_general"] = _CATALOGO.precio_general
+RESPONSE_TEMPLATES["marca_general"] = _CATALOGO.marca_general
+
+_RECARGA_LOCK = threading.Lock()
+
+def recargar_catalogo(nuevo_catalogo):
+    """
+    Compila el nuevo catálogo (textos, matcher e índices) aparte y lo publica
+    con un solo swap de referencia. Las peticiones no toman ningún lock: cada
+    una lee `_CATALOGO` una vez y trabaja con esa versión; el lock solo ordena
+    recargas concurrentes.
+    """
+    global CATALOGO, _CATALOGO, CATALOGO_VERSION
+    with _RECARGA_LOCK:
+        compilado = CatalogoCompilado(nuevo_catalogo, version=_CATALOGO.version + 1,
+                                      palabras_clave=INTENCIONES_KEYWORDS, flexiones=FLEXIONES_KEYWORDS)
+        _CATALOGO = compilado
+        CATALOGO = compilado.catalogo
+        CATALOGO_VERSION = compilado.version
+        RESPONSE_TEMPLATES["catalogo_completo"] = compilado.catalogo_completo
+        RESPONSE_TEMPLATES["precio_general"] = compilado.precio_general
+        RESPONSE_TEMPLATES["marca_general"] = compilado.marca_general
+
+RECARGADOR_CATALOGO = RecargadorCatalogo(CATALOG_PATH, recargar_catalogo, CATALOG_RELOAD_INTERVAL)
+
+def estado_catalogo():
+    catalogo = _CATALOGO
+    return {"version": catalogo.version, "products": len(catalogo.productos), **RECARGADOR_CATALOGO.stats()}
+
+# --- PREPROCESAMIENTO ---
+def obtener_lemas(texto):
+    """Lemas plegados con spaCy, o None si todavía no cargó"""
+    pln = obtener_pln_si_listo()
+    if pln is None:
+        return None
+    desactivados = [p for p in ("parser", "ner") if p in pln.pipe_names]
+    return tokenizar(" ".join(t.lemma_ or t.text for t in pln(texto, disable=desactivados)))
+
+class MensajeNormalizado:
+    """
+    Un mensaje preprocesado una sola vez: tokens plegados (sin acentos),
+    lemas opcionales y las keywords/tokens del catálogo que contiene.
+    Lo reutilizan la detección de intención y las respuestas.
+    """
+    __slots__ = ("original", "tokens", "lemas", "encontrados", "version")
+
+    def __init__(self, mensaje, lematizar_tokens=INTENT_LEMMATIZE):
+        matcher = _CATALOGO.matcher
+        self.original = mensaje
+        self.tokens = tokenizar(mensaje)
+        self.lemas = obtener_lemas(mensaje) if lematizar_tokens else None
+        self.encontrados = buscar_en_tokens(self.tokens, matcher)
+        if self.lemas:
+            self.encontrados |= buscar_en_tokens(self.lemas, matcher)
+        self.version = _CATALOGO.version
+
+def preprocesar_mensaje(mensaje):
+    if isinstance(mensaje, MensajeNormalizado) and mensaje.version == _CATALOGO.version:
+        return mensaje
+    texto = mensaje.original if isinstance(mensaje, MensajeNormalizado) else mensaje
+    return MensajeNormalizado(texto)
+
 # --- DETECCIÓN DE INTENCIÓN ---
 def detectar_intencion(mensaje):
-    mensaje_lower = mensaje.lower().strip()
-    for marca, productos in CATALOGO.items():
-        for nombre in productos.keys():
-            palabras = nombre.lower().split()
-            if len(palabras) >= 2:
-                coincidencias = sum(1 for p in palabras if p in mensaje_lower)
-                if coincidencias >= 2:
-                    return "modelo_especifico", nombre
-    if any(p in mensaje_lower for p in ["hola", "buenas", "hey", "saludos", "qué tal"]):
-        return "saludo", "hola"
-    if any(p in mensaje_lower for p in ["gracias", "adiós", "chao", "perfecto", "ok"]):
-        return "despedida", "gracias"
-    if any(p in mensaje_lower for p in ["gaming", "juegos", "gamer", "rtx", "gráficos"]):
-        return "gaming", "gaming"
-    if any(p in mensaje_lower for p in ["trabajo", "oficina", "profesional", "negocios"]):
-        return "trabajo", "trabajo"
-    if any(p in mensaje_lower for p in ["barato", "económico", "accesible", "bajo presupuesto"]):
-        return "barato", "barato"
-    if any(p in mensaje_lower for p in ["precio", "cuánto cuesta", "cuánto vale", "costo"]):
-        return "precio", "precio"
-    if any(p in mensaje_lower for p in ["catálogo", "catalogo", "opciones", "qué tienen", "ver todo", "laptop", "laptops", "computadora","computadoras"]):
-        return "catalogo", "catalogo"
-    if any(p in mensaje_lower for p in ["marca", "marcas", "fabricante"]):
-        return "marca", "marca"
-    if any(p in mensaje_lower for p in ["apartar", "reservar", "comprar"]):
-        return "apartar", "apartar"
-    if "dell" in mensaje_lower:
-        return "dell", "dell"
-    if "hp" in mensaje_lower:
-        return "hp", "hp"
-    if "lenovo" in mensaje_lower:
-        return "lenovo", "lenovo"
+    catalogo = _CATALOGO
+    matcher = catalogo.matcher
+    encontrados = preprocesar_mensaje(mensaje).encontrados
+    if not encontrados:
+        return "desconocido", None
+    for nombre, palabras in matcher["modelos"]:
+        if len(palabras) >= 2 and sum(1 for p in palabras if p in encontrados) >= 2:
+            return "modelo_especifico", nombre
+    for intencion, keyword, palabras in INTENCIONES_KEYWORDS:
+        if any(p in encontrados for p in palabras):
+            return intencion, keyword
+    for marca in catalogo.catalogo:
+        if marca in encontrados:
+            return marca, marca
     return "desconocido", None
 
+def detectar_intencion_semantica(mensaje, umbral=SEMANTIC_THRESHOLD):
+    """Nivel intermedio: intención del ejemplo más parecido si supera el umbral"""
+    with METRICS.timer("semantic_classification"):
+        intencion, similitud = CLASIFICADOR_SEMANTICO.clasificar(preprocesar_mensaje(mensaje).tokens)
+    if similitud >= umbral:
+        return intencion, similitud
+    return "desconocido", similitud
+
 # --- RESPUESTAS ---
 def generar_respuesta_marca(marca):
-    if marca not in CATALOGO:
-        return RESPONSE_TEMPLATES["marca_general"]
-    productos = CATALOGO[marca]
-    respuesta = f"Estos son los modelos de **{marca.upper()}**:\n\n"
-    for nombre, specs in productos.items():
-        extra = f", {specs.get('extra', '')}" if specs.get('extra') else ""
-        respuesta += f"• **{nombre}**: ${specs['precio']} - {specs['ram']}, {specs['storage']}{extra}\n"
-    respuesta += "\n¿Cuál te interesa más?"
-    return respuesta
+    catalogo = _CATALOGO
+    return catalogo.listado_marca.get(marca, catalogo.marca_general)
 
 def generar_respuesta_precio(mensaje):
-    mensaje_lower = mensaje.lower()
-    for marca in ["dell", "hp", "lenovo"]:
-        if marca in mensaje_lower:
-            return generar_respuesta_marca(marca)
-    for marca, productos in CATALOGO.items():
-        for nombre, specs in productos.items():
-            if any(p in mensaje_lower for p in nombre.lower().split()):
-                extra = f", {specs.get('extra', '')}" if specs.get('extra') else ""
-                return f"El **{nombre}** cuesta **${specs['precio']}** ({specs['ram']}, {specs['storage']}{extra}). ¿Te interesa?"
-    return RESPONSE_TEMPLATES["precio_general"]
+    catalogo = _CATALOGO
+    encontrados = preprocesar_mensaje(mensaje).encontrados
+    for marca in catalogo.catalogo:
+        if marca in encontrados:
+            return catalogo.listado_marca[marca]
+    for nombre, palabras in catalogo.matcher["modelos"]:
+        if any(p in encontrados for p in palabras):
+            return catalogo.precio_modelo[nombre]
+    return catalogo.precio_general
 
 def generar_respuesta_gaming():
-    return """
-Para gaming te recomiendo:
-
-1. **Dell Alienware M15** - $1,800 (RTX 3070)
-2. **Lenovo Legion 5 Pro** - $1,600 (RTX 3070)
-3. **HP Omen 16** - $1,500 (RTX 3060)
-
-¿Cuál se ajusta a tu presupuesto?
-"""
+    return _CATALOGO.gaming
 
 def generar_respuesta_trabajo():
-    return """
-Para trabajo profesional:
+    return _CATALOGO.trabajo
 
-1. **Lenovo ThinkPad X1** - $1,200 (32GB RAM)
-2. **Dell XPS 13** - $1,200 (pantalla 4K)
-3. **HP Envy 13** - $950 (táctil)
+def generar_respuesta_barato():
+    return _CATALOGO.barato
+
+# Intenciones que admiten filtros de presupuesto/specs ("gaming de menos de $1,600", "dell con 32GB");
+# las de marca también, ver admite_filtros
+INTENCIONES_CON_FILTROS = ("desconocido", "precio", "barato", "gaming", "trabajo", "catalogo")
+
+def admite_filtros(intencion, catalogo=None):
+    return intencion in INTENCIONES_CON_FILTROS or intencion in (catalogo or _CATALOGO).catalogo
+
+def generar_respuesta_busqueda(requisitos, intencion):
+    """Consulta por rango sobre los índices del catálogo en lugar de GPT-2"""
+    catalogo = _CATALOGO
+    return catalogo.recomendar_busqueda(
+        requisitos.precio_min, requisitos.precio_max, requisitos.ram_min, requisitos.almacenamiento_min,
+        marca=intencion if intencion in catalogo.catalogo else None,
+        gaming=intencion == "gaming"
+    )
 
-¿Qué tipo de trabajo haces?
-"""
+def generar_respuesta_modelo_especifico(nombre_modelo):
+    catalogo = _CATALOGO
+    ficha = catalogo.ficha_modelo.get(nombre_modelo)
+    if ficha:
+        return ficha
+    return "¿No lo encontré! Aquí tienes todo:\n\n" + catalogo.catalogo_completo
 
-def generar_respuesta_barato():
-    return """
-Opciones económicas:
-
-1. **HP Pavilion** - $600 (8GB RAM)
-2. **Lenovo IdeaPad 5** - $700 (SSD)
-3. **Dell Inspiron 15** - $800 (16GB RAM)
-
-¿Cuál prefieres?
-"""
-
-def generar_respuesta_modelo_especifico(nombre_modelo, historial):
-    for marca, productos in CATALOGO.items():
-        if nombre_modelo in productos:
-            specs = productos[nombre_modelo]
-            caracteristicas = f"\n• **Precio:** ${specs['precio']}"
-            caracteristicas += f"\n• **RAM:** {specs['ram']}"
-            caracteristicas += f"\n• **Almacenamiento:** {specs['storage']}"
-            if specs.get('extra'):
-                caracteristicas += f"\n• **Extra:** {specs.get('extra')}"
-            respuesta = f"El **{nombre_modelo}** tiene:{caracteristicas}\n\n¿Quieres reservarlo?"
-            historial.append({"role": "assistant", "content": respuesta})
-            return respuesta
-    return "¿No lo encontré! Aquí tienes todo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
-
-# --- DETECCIÓN DE MODELO EN HISTORIAL ---
-def obtener_ultimo_modelo(historial):
+# --- DETECCIÓN DE MODELO EN UN TURNO ---
+def detectar_modelo_mencionado(texto):
     """
-    Busca el último modelo mencionado o confirmado en el historial.
-    Devuelve el nombre exacto del modelo si lo encuentra.
+    Devuelve el primer modelo del catálogo cuyas palabras aparecen todas en el texto.
+    Se evalúa una vez por turno para que el estado de la sesión guarde el último
+    modelo mencionado sin volver a recorrer el historial.
     """
-    for msg in reversed(historial):
-        # Buscar texto en 'content' o 'Modelo'
-        texto = msg.get("content") or msg.get("Modelo") or ""
-        texto_lower = texto.lower()
-        for marca, productos in CATALOGO.items():
-            for nombre in productos.keys():
-                nombre_lower = nombre.lower()
-                # Coincidencia exacta o al menos dos palabras del modelo
-                palabras = nombre_lower.split()
-                if nombre_lower in texto_lower or all(p in texto_lower for p in palabras):
-                    return nombre
+    matcher = _CATALOGO.matcher
+    encontrados = preprocesar_mensaje(texto).encontrados
+    for nombre, palabras in matcher["modelos"]:
+        if all(p in encontrados for p in palabras):
+            return nombre
     return None
 
 
-def generar_respuesta_apartar_con_historial(message, historial):
-    mensaje_lower = message.lower()
+@lru_cache(maxsize=512)
+def _modelo_en_respuesta(respuesta, version):
+    # Las respuestas de plantilla se repiten: se analizan una vez por versión del catálogo
+    return detectar_modelo_mencionado(respuesta)
+
+def generar_respuesta_apartar_con_historial(message, estado):
+    catalogo = _CATALOGO
+    encontrados = preprocesar_mensaje(message).encontrados
     modelo_encontrado = None
-    marca_encontrada = None
 
     # Paso 1: buscar modelo mencionado directamente en el mensaje
-    for marca, productos in CATALOGO.items():
-        for nombre in productos.keys():
-            nombre_lower = nombre.lower()
-            palabras_modelo = nombre_lower.split()
-            # Si se menciona directamente el nombre completo o al menos dos palabras clave
-            if nombre_lower in mensaje_lower or sum(1 for p in palabras_modelo if p in mensaje_lower) >= 2:
-                modelo_encontrado = nombre
-                marca_encontrada = marca
-                break
-        if modelo_encontrado:
-            historial.append({"Modelo": modelo_encontrado})
+    for nombre, palabras_modelo in catalogo.matcher["modelos"]:
+        # Si se menciona el nombre completo o al menos dos de sus palabras
+        if all(p in encontrados for p in palabras_modelo) or sum(1 for p in palabras_modelo if p in encontrados) >= 2:
+            modelo_encontrado = nombre
             break
 
-    # Paso 2: si no se menciona en el mensaje, buscar el último del historial
-    if not modelo_encontrado:
-        ultimo_modelo = obtener_ultimo_modelo(historial)
-        if ultimo_modelo:
-            for marca, productos in CATALOGO.items():
-                if ultimo_modelo in productos:
-                    modelo_encontrado = ultimo_modelo
-                    marca_encontrada = marca
-                    break
+    # Paso 2: si no se menciona en el mensaje, usar el último modelo de la sesión
+    if not modelo_encontrado and estado.last_model in catalogo.reserva_modelo:
+        modelo_encontrado = estado.last_model
 
     # Paso 3: si aún no lo encuentra, pedir confirmación
     if not modelo_encontrado:
         return "No sé cuál laptop quieres reservar.\n¿Puedes decirme el modelo? (Ej: *Dell XPS 13*, *HP Omen 16*)"
 
-    # Paso 4: construir la respuesta
-    specs = CATALOGO[marca_encontrada][modelo_encontrado]
-    extra = f", {specs.get('extra', '')}" if specs.get('extra') else ""
-    respuesta = (
-        f"¡Perfecto! Reservando el **{modelo_encontrado}** (${specs['precio']})\n"
-        f"• RAM: {specs['ram']}\n"
-        f"• Almacenamiento: {specs['storage']}{extra}\n\n"
-        "**Reserva confirmada por 24 horas**\n"
-        "Te enviaré un enlace de pago o puedes pasar por tienda.\n\n"
-        "¿Agregar algo más?"
-    )
-
-    historial.append({"role": "assistant", "content": respuesta})
-    return respuesta
+    # Paso 4: respuesta precompilada
+    return catalogo.reserva_modelo[modelo_encontrado]
 
 # --- FALLBACK GENERATIVO ---
-def generar_respuesta_generativa(mensaje, contexto_productos):
-    if GENERATOR is None:
-        return "No puedo generar respuesta ahora. Aquí tienes el catálogo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
-    prompt = f"""Eres un asistente de ventas. Solo puedes hablar de estos productos:
+def construir_prefijo(contexto_productos):
+    """Parte fija del prompt: solo cambia cuando cambia el catálogo"""
+    return f"""Eres un asistente de ventas. Solo puedes hablar de estos productos:
 
 {contexto_productos}
 
@@ -273,85 +293,335 @@ REGLAS:
 - NO inventes nada.
 - Termina con una pregunta.
 
-Usuario: {mensaje}
+Usuario:"""
+
+def construir_sufijo(mensaje):
+    return f""" {mensaje}
 Asistente:"""
+
+CACHE_PREFIJO = PrefixKVCache()
+
+def generar_lote(mensajes, streamer=None, cancelado=None):
+    """
+    Un solo llamado al modelo para varios mensajes. Con la caché de prefijo se
+    reutilizan los past_key_values del preámbulo; si no está disponible se usa
+    el pipeline con el prompt completo. Cada fila se detiene en su primer fin
+    de oración; `streamer` (solo con un mensaje) recibe los tokens al generarse.
+    """
+    generador = obtener_generador()
+    catalogo = _CATALOGO
+    prefijo = construir_prefijo(catalogo.contexto)
+    sufijos = [construir_sufijo(m) for m in mensajes]
+    parametros = dict(
+        max_new_tokens=GENERATIVE_MAX_NEW_TOKENS,
+        do_sample=True,
+        temperature=0.6,
+        top_p=0.9,
+        top_k=40,
+        repetition_penalty=1.2,
+        pad_token_id=generador.tokenizer.eos_token_id,
+        eos_token_id=generador.tokenizer.eos_token_id
+    )
+    if usa_transformers():
+        parametros["stopping_criteria"] = criterios_fin_oracion(generador.tokenizer, cancelado)
+    if streamer is not None:
+        parametros["streamer"] = streamer
+    if GENERATIVE_PREFIX_CACHE and soporta_cache_prefijo() and getattr(generador, "model", None) is not None:
+        try:
+            return CACHE_PREFIJO.generate(generador.model, generador.tokenizer,
+                                          prefijo, sufijos, catalogo.version, **parametros)
+        except Exception as e:
+            print(f"Caché de prefijo no disponible, se usa el prompt completo: {e}")
+            METRICS.increment("prefix_cache_error")
+    resultados = generador(
+        [prefijo + sufijo for sufijo in sufijos],
+        batch_size=len(sufijos),
+        return_full_text=False,
+        num_return_sequences=1,
+        **parametros
+    )
+    return [resultado[0]['generated_text'] for resultado in resultados]
+
+def postprocesar_generacion(texto):
+    respuesta = FIN_ORACION.split(texto.strip())[0].strip()
+    if len(respuesta) < 10:
+        return "¿Podrías ser más específico? Aquí tienes el catálogo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
+    if not respuesta.endswith(('.', '!', '?')):
+        respuesta += "."
+    if not "?" in respuesta:
+        respuesta = respuesta[:-1] + ". ¿Te interesa?"
+    return respuesta.capitalize()
+
+# --- CACHÉ DEL FALLBACK GENERATIVO ---
+CACHE_GENERATIVA = LRUTTLCache(maxsize=GENERATIVE_CACHE_SIZE, ttl=GENERATIVE_CACHE_TTL)
+
+def normalizar_mensaje(mensaje, lematizar=GENERATIVE_CACHE_LEMMATIZE):
+    """
+    Forma canónica del mensaje: minúsculas, sin acentos ni puntuación y con
+    espacios colapsados. Si se pide y spaCy ya está cargado, usa los lemas.
+    """
+    texto = " ".join(tokenizar(mensaje))
+    if lematizar:
+        lemas = obtener_lemas(texto)
+        if lemas is not None:
+            texto = " ".join(lemas)
+    return texto
+
+POOL_GENERATIVO = GenerativePool(
+    generar_lote,
+    max_queue=GENERATIVE_QUEUE_SIZE,
+    max_batch=GENERATIVE_MAX_BATCH,
+    batch_window=GENERATIVE_BATCH_WINDOW
+)
+
+# --- RESPUESTAS DE RESPALDO DEL FALLBACK GENERATIVO ---
+_RESPUESTA_ERROR = "No entendí bien. ¿Quieres ver el catálogo?"
+
+def _respuesta_sin_modelo():
+    return "No puedo generar respuesta ahora. Aquí tienes el catálogo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
+
+def _respuesta_cola_llena():
+    # Cola llena: se responde con plantilla en lugar de esperar al modelo
+    return "Estoy atendiendo muchas consultas. Mientras tanto, aquí tienes el catálogo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
+
+def _registrar_fallo(futuro, error):
+    """Cancela una generación vencida o registra el error; devuelve la respuesta de respaldo"""
+    if isinstance(error, (FuturesTimeout, queue.Empty)):
+        futuro.cancel()
+        METRICS.increment("generative_timeout")
+    else:
+        print(f"Error GPT-2: {error}")
+    return _RESPUESTA_ERROR
+
+def generar_respuesta_generativa(mensaje):
+    if obtener_generador() is None:
+        return _respuesta_sin_modelo()
+    clave = (normalizar_mensaje(mensaje), CATALOGO_VERSION)
+    respuesta = CACHE_GENERATIVA.get(clave)
+    if respuesta is not None:
+        return respuesta
+    futuro = POOL_GENERATIVO.submit(mensaje)
+    if futuro is None:
+        return _respuesta_cola_llena()
+    try:
+        respuesta = postprocesar_generacion(futuro.result(timeout=GENERATIVE_TIMEOUT))
+        CACHE_GENERATIVA.set(clave, respuesta)
+        return respuesta
+    except Exception as e:
+        return _registrar_fallo(futuro, e)
+
+def generar_respuesta_generativa_stream(mensaje):
+    """
+    Generador de fragmentos de la respuesta generativa a medida que el modelo
+    produce tokens; devuelve (return) la respuesta final completa. La
+    generación corre en el hilo del pool y se detiene en el primer fin de
+    oración o cuando el consumidor deja de leer.
+    """
+    generador = obtener_generador()
+    if generador is None:
+        respuesta = _respuesta_sin_modelo()
+        yield respuesta
+        return respuesta
+    clave = (normalizar_mensaje(mensaje), CATALOGO_VERSION)
+    respuesta = CACHE_GENERATIVA.get(clave)
+    if respuesta is not None:
+        yield respuesta
+        return respuesta
+
+    if usa_transformers():
+        from transformers import TextIteratorStreamer as Streamer
+    else:
+        Streamer = StreamerTokens
+    streamer = Streamer(generador.tokenizer, skip_prompt=True,
+                        skip_special_tokens=True, timeout=GENERATIVE_TIMEOUT)
+    cancelado = threading.Event()
+
+    def generar():
+        try:
+            return generar_lote([mensaje], streamer=streamer, cancelado=cancelado)[0]
+        finally:
+            streamer.end()
+
+    futuro = POOL_GENERATIVO.submit_call(generar)
+    if futuro is None:
+        respuesta = _respuesta_cola_llena()
+        yield respuesta
+        return respuesta
+
+    fragmentador = FragmentadorRespuesta()
+    inicio = time.perf_counter()
+    primero = True
     try:
-        resultado = GENERATOR(
-            prompt,
-            max_length=len(GENERATOR.tokenizer.encode(prompt)) + 50,
-            num_return_sequences=1,
-            do_sample=True,
-            temperature=0.6,
-            top_p=0.9,
-            top_k=40,
-            repetition_penalty=1.2,
-            pad_token_id=GENERATOR.tokenizer.eos_token_id,
-            eos_token_id=GENERATOR.tokenizer.eos_token_id
-        )
-        texto = resultado[0]['generated_text'][len(prompt):].strip()
-        respuesta = re.split(r'[.!?]\s*|\n', texto)[0].strip()
-        if len(respuesta) < 10:
-            return "¿Podrías ser más específico? Aquí tienes el catálogo:\n\n" + RESPONSE_TEMPLATES["catalogo_completo"]
-        if not respuesta.endswith(('.', '!', '?')):
-            respuesta += "."
-        if not "?" in respuesta:
-            respuesta = respuesta[:-1] + ". ¿Te interesa?"
-        return respuesta.capitalize()
+        for texto in streamer:
+            fragmento = fragmentador.agregar(texto)
+            if fragmento:
+                if primero:
+                    METRICS.observe("generative_first_token", time.perf_counter() - inicio)
+                    primero = False
+                yield fragmento
+        respuesta = postprocesar_generacion(futuro.result(timeout=GENERATIVE_TIMEOUT))
+        CACHE_GENERATIVA.set(clave, respuesta)
     except Exception as e:
-        print(f"Error GPT-2: {e}")
-        return "No entendí bien. ¿Quieres ver el catálogo?"
+        respuesta = _registrar_fallo(futuro, e)
+    finally:
+        cancelado.set()
+    resto = fragmentador.finalizar(respuesta)
+    if resto:
+        yield resto
+    return respuesta
+
+def generar_respuestas_generativas(mensajes):
+    """
+    Variante por lotes: consulta la caché, agrupa los mensajes repetidos y
+    envía el resto al pool en bloques de GENERATIVE_BULK_BATCH prompts, cada
+    bloque en un solo llamado al modelo. Devuelve las respuestas en orden.
+    """
+    if obtener_generador() is None:
+        return [_respuesta_sin_modelo()] * len(mensajes)
+    claves = [(normalizar_mensaje(m), CATALOGO_VERSION) for m in mensajes]
+    respuestas = {}
+    faltantes = {}  # clave -> mensaje a generar
+    for clave, mensaje in zip(claves, mensajes):
+        if clave in respuestas or clave in faltantes:
+            continue
+        respuesta = CACHE_GENERATIVA.get(clave)
+        if respuesta is not None:
+            respuestas[clave] = respuesta
+        else:
+            faltantes[clave] = mensaje
+
+    pendientes = list(faltantes.items())
+    bloques = []
+    for i in range(0, len(pendientes), GENERATIVE_BULK_BATCH):
+        bloque = pendientes[i:i + GENERATIVE_BULK_BATCH]
+        bloques.append((bloque, POOL_GENERATIVO.submit_many([mensaje for _, mensaje in bloque])))
+    for bloque, futuro in bloques:
+        if futuro is None:
+            for clave, _ in bloque:
+                respuestas[clave] = _respuesta_cola_llena()
+            continue
+        try:
+            for (clave, _), texto in zip(bloque, futuro.result(timeout=GENERATIVE_TIMEOUT)):
+                respuestas[clave] = postprocesar_generacion(texto)
+                CACHE_GENERATIVA.set(clave, respuestas[clave])
+        except Exception as e:
+            respuesta = _registrar_fallo(futuro, e)
+            for clave, _ in bloque:
+                respuestas[clave] = respuesta
+    return [respuestas[clave] for clave in claves]
 
 # --- FUNCIÓN PRINCIPAL ---
-historial = []
-def response_chat(message):
-    
-    historial.append({"role": "user", "content": message})
-    intencion, keyword = detectar_intencion(message)
+def _responder_con_plantilla(message, estado):
+    """Registra el turno del usuario y responde por plantilla; None si hace falta el modelo"""
+    # Se normaliza una vez; detección, precio y reserva reutilizan los mismos tokens
+    with METRICS.timer("intent_detection"):
+        normalizado = preprocesar_mensaje(message)
+        intencion, keyword = detectar_intencion(normalizado)
+    nivel = "keyword"
+    requisitos = None
+    catalogo = _CATALOGO
+    if admite_filtros(intencion, catalogo):
+        # Presupuesto o specs en el mensaje: consulta por rango al catálogo
+        requisitos = extraer_requisitos(normalizado.original)
+        if requisitos:
+            nivel = "spec"
+    if intencion == "desconocido" and not requisitos:
+        # Paráfrasis de intenciones conocidas: plantilla en vez de GPT-2
+        intencion, _ = detectar_intencion_semantica(normalizado)
+        nivel = "semantic" if intencion != "desconocido" else "generative"
+    METRICS.increment(f"intent_tier_{nivel}")
+    estado.add_turn("user", message, detectar_modelo_mencionado(normalizado))
     respuestas_rapidas = {
-        "saludo": lambda: random.choice(RESPONSE_TEMPLATES["saludo"]),
+        "saludo": lambda: random.choice(RESPONSE_TEMPLATES["saludo"]).format(marcas=catalogo.nombres_marcas),
         "despedida": lambda: random.choice(RESPONSE_TEMPLATES["despedida"]),
-        "marca": lambda: RESPONSE_TEMPLATES["marca_general"],
+        "marca": lambda: catalogo.marca_general,
         "catalogo": lambda: RESPONSE_TEMPLATES["catalogo_completo"],
-        "precio": lambda: generar_respuesta_precio(message),
+        "precio": lambda: generar_respuesta_precio(normalizado),
         "gaming": lambda: generar_respuesta_gaming(),
         "trabajo": lambda: generar_respuesta_trabajo(),
         "barato": lambda: generar_respuesta_barato(),
-        "dell": lambda: generar_respuesta_marca("dell"),
-        "hp": lambda: generar_respuesta_marca("hp"),
-        "lenovo": lambda: generar_respuesta_marca("lenovo"),
-        "apartar": lambda: generar_respuesta_apartar_con_historial(message, historial),
-        "modelo_especifico": lambda: generar_respuesta_modelo_especifico(keyword, historial),
+        "apartar": lambda: generar_respuesta_apartar_con_historial(normalizado, estado),
+        "modelo_especifico": lambda: generar_respuesta_modelo_especifico(keyword),
     }
-    print(historial)
+    if intencion in catalogo.listado_marca:
+        respuestas_rapidas[intencion] = lambda marca=intencion: generar_respuesta_marca(marca)
+    if requisitos:
+        filtrada = intencion
+        respuestas_rapidas["busqueda"] = lambda: generar_respuesta_busqueda(requisitos, filtrada)
+        intencion, keyword = "busqueda", requisitos.clave()
     if intencion in respuestas_rapidas:
-        respuesta = respuestas_rapidas[intencion]()
-        historial.append({"role": "assistant", "content": respuesta})
+        with METRICS.timer("template_rendering"):
+            respuesta = respuestas_rapidas[intencion]()
+        estado.add_turn("assistant", respuesta, _modelo_en_respuesta(respuesta, _CATALOGO.version))
         return {
             "response": respuesta,
             "category": intencion,
             "matched_keyword": keyword,
-            "response_time": "instant",
-            "historial": historial
+            "response_time": "instant"
         }
     if intencion == "desconocido":
-        contexto = "\n".join([
-            f"- {nombre}: ${specs['precio']}, {specs['ram']}, {specs['storage']}{' (' + specs.get('extra','') + ')' if specs.get('extra') else ''}"
-            for marca, productos in CATALOGO.items()
-            for nombre, specs in productos.items()
-        ])
-        respuesta = generar_respuesta_generativa(message, contexto)
-        historial.append({"role": "assistant", "content": respuesta})
-        return {
-            "response": respuesta,
-            "category": "fallback_generativo",
-            "matched_keyword": None,
-            "response_time": "generative",
-            "historial": historial
-        }
+        return None
     return {
         "response": RESPONSE_TEMPLATES["catalogo_completo"],
         "category": "fallback_final",
         "matched_keyword": None,
-        "response_time": "instant",
-        "historial": historial
+        "response_time": "instant"
+    }
+
+def _resultado_generativo(respuesta, estado):
+    estado.add_turn("assistant", respuesta, detectar_modelo_mencionado(respuesta))
+    return {
+        "response": respuesta,
+        "category": "fallback_generativo",
+        "matched_keyword": None,
+        "response_time": "generative"
     }
+
+def response_chat(message, estado=None):
+    if estado is None:
+        estado = ConversationState()
+    resultado = _responder_con_plantilla(message, estado)
+    if resultado is not None:
+        return resultado
+    with METRICS.timer("generative_fallback"):
+        respuesta = generar_respuesta_generativa(message)
+    return _resultado_generativo(respuesta, estado)
+
+def response_chat_stream(message, estado=None):
+    """
+    Variante de response_chat para streaming: devuelve (resultado, fragmentos).
+    Las plantillas salen en un solo fragmento; el fallback generativo emite
+    el texto mientras se genera. resultado["response"] queda completo al
+    agotar los fragmentos.
+    """
+    if estado is None:
+        estado = ConversationState()
+    resultado = _responder_con_plantilla(message, estado)
+    if resultado is not None:
+        return resultado, iter((resultado["response"],))
+    resultado = {"response": "", "category": "fallback_generativo", "matched_keyword": None,
+                 "response_time": "generative"}
+
+    def fragmentos():
+        inicio = time.perf_counter()
+        respuesta = yield from generar_respuesta_generativa_stream(message)
+        METRICS.observe("generative_fallback", time.perf_counter() - inicio)
+        resultado.update(_resultado_generativo(respuesta, estado))
+
+    return resultado, fragmentos()
+
+def response_chat_lote(peticiones):
+    """
+    Procesa [(mensaje, estado)] en dos fases: detección de intención y
+    plantillas para todos, luego un solo envío de los fallbacks generativos.
+    Las respuestas generativas se agregan al estado al final, así que dentro
+    del lote una sesión no ve el modelo mencionado en esas respuestas.
+    """
+    resultados = [_responder_con_plantilla(mensaje, estado) for mensaje, estado in peticiones]
+    pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+    if pendientes:
+        with METRICS.timer("generative_fallback"):
+            respuestas = generar_respuestas_generativas([peticiones[i][0] for i in pendientes])
+        for i, respuesta in zip(pendientes, respuestas):
+            resultados[i] = _resultado_generativo(respuesta, peticiones[i][1])
+    return resultados
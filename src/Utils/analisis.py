@@ -0,0 +1,60 @@
+from typing import List
+
+from src.Models.chat_model import NLPAnalysis
+from src.Utils.cache import LRUTTLCache
+from src.Utils.config import ANALYSIS_BATCH_SIZE, ANALYSIS_CACHE_SIZE, ANALYSIS_N_PROCESS
+from src.Utils.metrics import METRICS
+from src.Utils.model_loader import obtener_pln
+
+# Tokens, lemas y POS no necesitan el parser de dependencias ni las entidades
+COMPONENTES_DESACTIVADOS = ["parser", "ner"]
+
+# El análisis de un texto no cambia mientras no cambie el modelo: sin TTL
+CACHE_ANALISIS = LRUTTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=None)
+
+def _desactivados(pln) -> List[str]:
+    return [nombre for nombre in COMPONENTES_DESACTIVADOS if nombre in pln.pipe_names]
+
+def _a_analisis(doc) -> NLPAnalysis:
+    tokens = [t for t in doc if not t.is_space]
+    return NLPAnalysis(
+        tokens=[t.text for t in tokens],
+        lemmas=[t.lemma_ for t in tokens],
+        pos_tags=[(t.text, t.lemma_, t.pos_) for t in tokens],
+        processed_message=" ".join(t.lemma_.lower() for t in tokens if not t.is_punct)
+    )
+
+def analizar_texto(texto: str) -> NLPAnalysis:
+    """Tokens, lemas y POS de un texto (con caché LRU por texto)"""
+    analisis = CACHE_ANALISIS.get(texto)
+    if analisis is not None:
+        return analisis
+    pln = obtener_pln()
+    with METRICS.timer("nlp_analysis"):
+        analisis = _a_analisis(pln(texto, disable=_desactivados(pln)))
+    CACHE_ANALISIS.set(texto, analisis)
+    return analisis
+
+def analizar_lote(textos: List[str], batch_size: int = ANALYSIS_BATCH_SIZE,
+                  n_process: int = ANALYSIS_N_PROCESS) -> List[NLPAnalysis]:
+    """
+    Variante por lotes: los textos que no están en caché (sin repetir) pasan
+    juntos por pln.pipe. Devuelve los análisis en el orden de entrada.
+    """
+    resultados = {}
+    faltantes = []
+    for texto in dict.fromkeys(textos):
+        analisis = CACHE_ANALISIS.get(texto)
+        if analisis is not None:
+            resultados[texto] = analisis
+        else:
+            faltantes.append(texto)
+    if faltantes:
+        pln = obtener_pln()
+        with METRICS.timer("nlp_analysis_batch"):
+            docs = pln.pipe(faltantes, batch_size=batch_size, n_process=n_process,
+                            disable=_desactivados(pln))
+            for texto, doc in zip(faltantes, docs):
+                resultados[texto] = _a_analisis(doc)
+                CACHE_ANALISIS.set(texto, resultados[texto])
+    return [resultados[texto] for texto in textos]
@@ -0,0 +1,425 @@
+import bisect
+import csv
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.Utils.metrics import METRICS
+from src.Utils.texto import tokenizar
+
+# Etiquetas de GPU que marcan un equipo como apto para gaming
+ETIQUETAS_GPU = ("rtx", "gtx", "radeon")
+_GPU = re.compile(r"\b(" + "|".join(ETIQUETAS_GPU) + r")\s*(\w+)?", re.IGNORECASE)
+
+# Columnas del catálogo en CSV (una fila por modelo; extra es opcional)
+CAMPOS_CSV = ("marca", "modelo", "precio", "ram", "storage", "extra")
+CAMPOS_OBLIGATORIOS = ("precio", "ram", "storage")
+
+def formato_precio(precio) -> str:
+    return f"${precio:,}"
+
+def formato_capacidad(gb: int) -> str:
+    return f"{gb // 1024}TB" if gb >= 1024 and gb % 1024 == 0 else f"{gb}GB"
+
+def enumerar(elementos: Sequence[str]) -> str:
+    """Une con comas y "y" ("a, b y c")"""
+    if len(elementos) <= 1:
+        return "".join(elementos)
+    return ", ".join(elementos[:-1]) + " y " + elementos[-1]
+
+def _extra(specs: dict, separador: str = ", ") -> str:
+    return f"{separador}{specs['extra']}" if specs.get('extra') else ""
+
+def etiquetas_gpu(specs: dict) -> Tuple[str, ...]:
+    """Familia y modelo de la GPU indicada en extra ("RTX 3070" -> ("rtx", "rtx 3070"))"""
+    coincidencia = _GPU.search(specs.get('extra', ''))
+    if not coincidencia:
+        return ()
+    familia = coincidencia.group(1).lower()
+    if coincidencia.group(2):
+        return familia, f"{familia} {coincidencia.group(2).lower()}"
+    return (familia,)
+
+def es_gaming(specs: dict) -> bool:
+    return bool(etiquetas_gpu(specs))
+
+def _ram_gb(specs: dict) -> int:
+    digitos = "".join(c for c in specs.get('ram', '') if c.isdigit())
+    return int(digitos) if digitos else 0
+
+def _almacenamiento_gb(specs: dict) -> int:
+    """"1TB SSD" -> 1024, "512GB SSD" -> 512"""
+    coincidencia = re.search(r"(\d+(?:\.\d+)?)\s*(tb|gb)", specs.get('storage', '').lower())
+    if not coincidencia:
+        return 0
+    cantidad = float(coincidencia.group(1))
+    return int(cantidad * 1024) if coincidencia.group(2) == "tb" else int(cantidad)
+
+
+# --- CARGA DESDE ARCHIVO ---
+def _validar(catalogo: Dict[str, Dict[str, dict]]) -> Dict[str, Dict[str, dict]]:
+    for productos in catalogo.values():
+        for nombre, specs in productos.items():
+            faltantes = [campo for campo in CAMPOS_OBLIGATORIOS if not specs.get(campo)]
+            if faltantes:
+                raise ValueError(f"'{nombre}' no tiene {', '.join(faltantes)}")
+            specs['precio'] = int(float(specs['precio']))
+    return catalogo
+
+def leer_catalogo(ruta: str) -> Dict[str, Dict[str, dict]]:
+    """
+    Lee {marca: {modelo: specs}} desde JSON (con esa misma forma) o desde CSV
+    (columnas CAMPOS_CSV). ValueError si falta un campo o el precio no es numérico.
+    """
+    if ruta.lower().endswith(".csv"):
+        catalogo: Dict[str, Dict[str, dict]] = {}
+        with open(ruta, newline="", encoding="utf-8") as f:
+            for fila in csv.DictReader(f):
+                specs = {campo: (fila.get(campo) or "").strip() for campo in CAMPOS_OBLIGATORIOS}
+                if (fila.get("extra") or "").strip():
+                    specs["extra"] = fila["extra"].strip()
+                catalogo.setdefault(fila["marca"].strip().lower(), {})[fila["modelo"].strip()] = specs
+    else:
+        with open(ruta, encoding="utf-8") as f:
+            catalogo = json.load(f)
+    return _validar(catalogo)
+
+
+class RecargadorCatalogo:
+    """
+    Vigila el archivo del catálogo (mtime y tamaño) desde un hilo y, cuando
+    cambia, lo lee y entrega el resultado a `publicar`. Un archivo inválido
+    (p. ej. a medio escribir) se ignora: sigue publicada la versión anterior.
+    """
+
+    def __init__(self, ruta: str, publicar: Callable[[dict], None], intervalo: float = 2.0):
+        self.ruta = ruta
+        self.publicar = publicar
+        self.intervalo = intervalo
+        self._firma = self._leer_firma()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.recargas = 0
+        self.errores = 0
+        self.ultimo_error: Optional[str] = None
+
+    def _leer_firma(self) -> Optional[Tuple[int, int]]:
+        try:
+            estado = os.stat(self.ruta)
+        except OSError:
+            return None
+        return estado.st_mtime_ns, estado.st_size
+
+    def revisar(self) -> bool:
+        """Recarga si el archivo cambió desde la última revisión; True si publicó una versión nueva"""
+        firma = self._leer_firma()
+        if firma is None or firma == self._firma:
+            return False
+        self._firma = firma
+        try:
+            catalogo = leer_catalogo(self.ruta)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            self.errores += 1
+            self.ultimo_error = str(e)
+            METRICS.increment("catalog_reload_error")
+            print(f"Catálogo inválido en {self.ruta}, se mantiene la versión actual: {e}")
+            return False
+        self.publicar(catalogo)
+        self.recargas += 1
+        METRICS.increment("catalog_reload")
+        return True
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.revisar()
+
+    def start(self):
+        if self.intervalo <= 0 or self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="recarga-catalogo", daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.intervalo + 1)
+            self._hilo = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.ruta,
+            "reload_interval": self.intervalo,
+            "reloads": self.recargas,
+            "reload_errors": self.errores,
+            "last_error": self.ultimo_error,
+        }
+
+
+def construir_matcher(catalogo: Dict[str, Dict[str, dict]], palabras_clave: Sequence = (),
+                      flexiones: Dict[str, Sequence[str]] = {}) -> dict:
+    """
+    Indexa las keywords y los tokens de los modelos por sus tokens plegados
+    (minúsculas, sin acentos). Todo se busca como tokens completos o n-gramas
+    exactos, así "ok" no coincide dentro de "book" ni "hola" en "holanda".
+    Las flexiones listadas para una keyword ("reservar" -> "reservarlo") se
+    indexan como esa keyword.
+    """
+    modelos = []
+    terminos = set(catalogo.keys())
+    for productos in catalogo.values():
+        for nombre in productos.keys():
+            palabras = nombre.lower().split()
+            modelos.append((nombre, palabras))
+            terminos.update(palabras)
+    palabras_intencion = set()
+    for _, _, palabras in palabras_clave:
+        palabras_intencion.update(palabras)
+    terminos |= palabras_intencion
+
+    frases: Dict[Tuple[str, ...], set] = {}
+    for termino in terminos:
+        clave = tuple(tokenizar(termino))
+        if clave:
+            frases.setdefault(clave, set()).add(termino)
+    for termino, formas in flexiones.items():
+        for forma in formas:
+            clave = tuple(tokenizar(forma))
+            if clave:
+                frases.setdefault(clave, set()).add(termino)
+    return {
+        "frases": {clave: frozenset(originales) for clave, originales in frases.items()},
+        "longitud": max((len(clave) for clave in frases), default=1),
+        "modelos": modelos,
+    }
+
+
+def buscar_en_tokens(tokens: Sequence[str], matcher: dict) -> Set[str]:
+    """Términos (en su forma original) presentes en una secuencia de tokens plegados"""
+    frases, longitud = matcher["frases"], matcher["longitud"]
+    encontrados: Set[str] = set()
+    total = len(tokens)
+    for i in range(total):
+        for n in range(1, min(longitud, total - i) + 1):
+            originales = frases.get(tuple(tokens[i:i + n]))
+            if originales:
+                encontrados |= originales
+    return encontrados
+
+
+class CatalogoCompilado:
+    """
+    Vista precompilada del catálogo. Todas las respuestas que dependen solo de
+    los datos (listados por marca, fichas, reservas, recomendaciones y el
+    contexto del prompt) se construyen una vez al cargar el catálogo.
+    """
+
+    def __init__(self, catalogo: Dict[str, Dict[str, dict]], version: int = 1, palabras_clave: Sequence = (),
+                 flexiones: Dict[str, Sequence[str]] = {}):
+        self.catalogo = catalogo
+        self.version = version
+        self.matcher = construir_matcher(catalogo, palabras_clave, flexiones)
+        self.productos: List[Tuple[str, str, dict]] = []
+        for marca, productos in catalogo.items():
+            for nombre, specs in productos.items():
+                self.productos.append((marca, nombre, specs))
+
+        # --- ÍNDICES ---
+        # Precio, RAM y almacenamiento: listas ordenadas con sus claves en paralelo para bisect
+        self.por_marca = {marca: [p for p in self.productos if p[0] == marca] for marca in catalogo}
+        self.por_precio = sorted(self.productos, key=lambda p: p[2]['precio'])
+        self.precios = [specs['precio'] for _, _, specs in self.por_precio]
+        self.por_ram = sorted(self.productos, key=lambda p: (_ram_gb(p[2]), p[2]['precio']))
+        self.rams = [_ram_gb(specs) for _, _, specs in self.por_ram]
+        self.por_almacenamiento = sorted(self.productos, key=lambda p: (_almacenamiento_gb(p[2]), p[2]['precio']))
+        self.almacenamientos = [_almacenamiento_gb(specs) for _, _, specs in self.por_almacenamiento]
+        self.con_gpu = [p for p in self.por_precio if etiquetas_gpu(p[2])]
+        self.sin_gpu = [p for p in self.por_precio if not etiquetas_gpu(p[2])]
+        # Claves numéricas por modelo para comprobar los filtros restantes sin volver a parsear
+        self._claves = {nombre: (orden, specs['precio'], _ram_gb(specs), _almacenamiento_gb(specs), marca,
+                                 bool(etiquetas_gpu(specs)))
+                        for orden, (marca, nombre, specs) in enumerate(self.por_precio)}
+
+        self.contexto = "\n".join(
+            f"- {nombre}: ${specs['precio']}, {specs['ram']}, {specs['storage']}"
+            f"{' (' + specs['extra'] + ')' if specs.get('extra') else ''}"
+            for _, nombre, specs in self.productos
+        )
+        self.listado_marca = {marca: self._listado_marca(marca, productos)
+                              for marca, productos in catalogo.items()}
+        self.ficha_modelo = {nombre: self._ficha(nombre, specs) for _, nombre, specs in self.productos}
+        self.precio_modelo = {nombre: self._precio(nombre, specs) for _, nombre, specs in self.productos}
+        self.reserva_modelo = {nombre: self._reserva(nombre, specs) for _, nombre, specs in self.productos}
+
+        self.catalogo_completo = self._catalogo_completo()
+        self.precio_general = self._precio_general()
+        # Marcas del archivo: la intención de cada marca y sus textos salen de aquí
+        self.titulos_marca = {marca: self._titulo_marca(marca, productos) for marca, productos in catalogo.items()}
+        self.nombres_marcas = enumerar(list(self.titulos_marca.values()))
+        self.marca_general = self._marca_general()
+        self.gaming = self._recomendacion(
+            "Para gaming te recomiendo:",
+            sorted(self.con_gpu, key=lambda p: -p[2]['precio']),
+            lambda specs: specs['extra'],
+            "¿Cuál se ajusta a tu presupuesto?"
+        )
+        self.trabajo = self._recomendacion(
+            "Para trabajo profesional:",
+            sorted(self.sin_gpu, key=lambda p: (-p[2]['precio'], -_ram_gb(p[2]))),
+            lambda specs: specs.get('extra') or f"{specs['ram']} RAM",
+            "¿Qué tipo de trabajo haces?"
+        )
+        self.barato = self._recomendacion(
+            "Opciones económicas:",
+            self.por_precio,
+            lambda specs: f"{specs['ram']} RAM",
+            "¿Cuál prefieres?"
+        )
+
+    # --- CONSULTAS SOBRE LOS ÍNDICES ---
+    def entre_precios(self, minimo: float, maximo: float) -> List[Tuple[str, str, dict]]:
+        return self.por_precio[bisect.bisect_left(self.precios, minimo):bisect.bisect_right(self.precios, maximo)]
+
+    def con_ram_minima(self, gb: int) -> List[Tuple[str, str, dict]]:
+        """Productos con al menos `gb` de RAM, de menor a mayor RAM y precio"""
+        return self.por_ram[bisect.bisect_left(self.rams, gb):]
+
+    def con_almacenamiento_minimo(self, gb: int) -> List[Tuple[str, str, dict]]:
+        return self.por_almacenamiento[bisect.bisect_left(self.almacenamientos, gb):]
+
+    def buscar(self, precio_min=None, precio_max=None, ram_min=None, almacenamiento_min=None,
+               marca: Optional[str] = None, gaming: bool = False) -> List[Tuple[str, str, dict]]:
+        """
+        Productos que cumplen todos los filtros, de menor a mayor precio. Cada
+        filtro da un rango en su índice (bisect para precio, RAM y
+        almacenamiento; listas por marca y con GPU); se recorre el más corto
+        y los demás filtros se comprueban sobre las claves precalculadas.
+        """
+        minimo = precio_min if precio_min is not None else float("-inf")
+        maximo = precio_max if precio_max is not None else float("inf")
+        rangos = [self.entre_precios(minimo, maximo)]
+        if ram_min is not None:
+            rangos.append(self.con_ram_minima(ram_min))
+        if almacenamiento_min is not None:
+            rangos.append(self.con_almacenamiento_minimo(almacenamiento_min))
+        if marca is not None:
+            rangos.append(self.por_marca.get(marca, []))
+        if gaming:
+            rangos.append(self.con_gpu)
+        base = min(rangos, key=len)
+        if len(rangos) == 1:
+            return base
+        candidatos = []
+        for producto in base:
+            _, precio, ram, almacenamiento, marca_producto, con_gpu = self._claves[producto[1]]
+            if (minimo <= precio <= maximo
+                    and (ram_min is None or ram >= ram_min)
+                    and (almacenamiento_min is None or almacenamiento >= almacenamiento_min)
+                    and (marca is None or marca_producto == marca)
+                    and (not gaming or con_gpu)):
+                candidatos.append(producto)
+        candidatos.sort(key=lambda p: self._claves[p[1]][0])
+        return candidatos
+
+    def recomendar_busqueda(self, precio_min=None, precio_max=None, ram_min=None, almacenamiento_min=None,
+                            marca: Optional[str] = None, gaming: bool = False) -> str:
+        """Recomendación para un presupuesto y/o mínimos de specs ("hasta $1,000", "32GB o más")"""
+        condiciones = []
+        if precio_min is not None and precio_max is not None:
+            condiciones.append(f"entre {formato_precio(int(precio_min))} y {formato_precio(int(precio_max))}")
+        elif precio_max is not None:
+            condiciones.append(f"hasta {formato_precio(int(precio_max))}")
+        elif precio_min is not None:
+            condiciones.append(f"desde {formato_precio(int(precio_min))}")
+        if ram_min is not None:
+            condiciones.append(f"{formato_capacidad(ram_min)} de RAM o más")
+        if almacenamiento_min is not None:
+            condiciones.append(f"{formato_capacidad(almacenamiento_min)} de almacenamiento o más")
+        if marca is not None:
+            condiciones.append(f"marca {marca.upper()}")
+        if gaming:
+            condiciones.append("GPU para gaming")
+        descripcion = ", ".join(condiciones)
+
+        productos = self.buscar(precio_min, precio_max, ram_min, almacenamiento_min, marca, gaming)
+        if productos:
+            # Con solo un tope de precio, primero lo mejor que alcanza el presupuesto
+            if precio_max is not None and precio_min is None:
+                productos = productos[::-1]
+            return self._recomendacion(f"Opciones con {descripcion}:", productos,
+                                       lambda specs: f"{specs['ram']} RAM, {specs['storage']}{_extra(specs)}",
+                                       "¿Cuál te interesa?")
+        # Sin resultados: lo más barato que cumple las specs, ignorando el precio
+        alternativas = self.buscar(None, None, ram_min, almacenamiento_min, marca, gaming)
+        if alternativas and (precio_min is not None or precio_max is not None):
+            _, nombre, specs = alternativas[0]
+            return (f"No tengo equipos con {descripcion}. Lo más cercano es el **{nombre}** a "
+                    f"{formato_precio(specs['precio'])} ({specs['ram']} RAM, {specs['storage']}). ¿Te interesa?")
+        return f"No tengo equipos con {descripcion}. " + self.precio_general
+
+    # --- CONSTRUCCIÓN DE TEXTOS ---
+
+    def _listado_marca(self, marca: str, productos: dict) -> str:
+        lineas = [f"• **{nombre}**: ${specs['precio']} - {specs['ram']}, {specs['storage']}{_extra(specs)}"
+                  for nombre, specs in productos.items()]
+        return f"Estos son los modelos de **{marca.upper()}**:\n\n" + "\n".join(lineas) + "\n\n¿Cuál te interesa más?"
+
+    def _ficha(self, nombre: str, specs: dict) -> str:
+        caracteristicas = [
+            f"• **Precio:** ${specs['precio']}",
+            f"• **RAM:** {specs['ram']}",
+            f"• **Almacenamiento:** {specs['storage']}",
+        ]
+        if specs.get('extra'):
+            caracteristicas.append(f"• **Extra:** {specs['extra']}")
+        return f"El **{nombre}** tiene:\n" + "\n".join(caracteristicas) + "\n\n¿Quieres reservarlo?"
+
+    def _precio(self, nombre: str, specs: dict) -> str:
+        return (f"El **{nombre}** cuesta **${specs['precio']}** "
+                f"({specs['ram']}, {specs['storage']}{_extra(specs)}). ¿Te interesa?")
+
+    def _reserva(self, nombre: str, specs: dict) -> str:
+        return (
+            f"¡Perfecto! Reservando el **{nombre}** (${specs['precio']})\n"
+            f"• RAM: {specs['ram']}\n"
+            f"• Almacenamiento: {specs['storage']}{_extra(specs)}\n\n"
+            "**Reserva confirmada por 24 horas**\n"
+            "Te enviaré un enlace de pago o puedes pasar por tienda.\n\n"
+            "¿Agregar algo más?"
+        )
+
+    @staticmethod
+    def _titulo_marca(marca: str, productos: dict) -> str:
+        """Nombre de la marca como aparece en sus modelos ("hp" -> "HP")"""
+        return next(iter(productos)).split()[0] if productos else marca.capitalize()
+
+    def _catalogo_completo(self) -> str:
+        bloques = []
+        for marca, productos in self.catalogo.items():
+            titulo = self._titulo_marca(marca, productos)
+            lineas = [f"• {nombre}: {formato_precio(specs['precio'])} - {specs['ram']} RAM, {specs['storage']}{_extra(specs)}"
+                      for nombre, specs in productos.items()]
+            bloques.append(f"**{titulo}:**\n" + "\n".join(lineas))
+        return "\n" + "\n\n".join(bloques) + "\n"
+
+    def _marca_general(self) -> str:
+        marcas = [f"**{self.titulos_marca[marca]}** (desde "
+                  f"{formato_precio(min(specs['precio'] for specs in productos.values()))})"
+                  for marca, productos in self.catalogo.items() if productos]
+        if not marcas:
+            return "¿Qué marca te interesa?"
+        return f"Trabajamos con {enumerar(marcas)}. ¿Cuál te interesa?"
+
+    def _precio_general(self) -> str:
+        if not self.productos:
+            return "¿Qué presupuesto tienes?"
+        precios = [specs['precio'] for _, _, specs in self.productos]
+        return (f"Nuestros precios van desde **{formato_precio(min(precios))}** (básicos) "
+                f"hasta **{formato_precio(max(precios))}** (gaming). ¿Qué presupuesto tienes?")
+
+    def _recomendacion(self, titulo: str, productos: list, destacado, pregunta: str, limite: int = 3) -> str:
+        lineas = [f"{i}. **{nombre}** - {formato_precio(specs['precio'])} ({destacado(specs)})"
+                  for i, (_, nombre, specs) in enumerate(productos[:limite], start=1)]
+        return f"\n{titulo}\n\n" + "\n".join(lineas) + f"\n\n{pregunta}\n"
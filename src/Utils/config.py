@@ -0,0 +1,77 @@
+import os
+
+# Configuración por variables de entorno (prefijo CHATBOT_)
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(f"CHATBOT_{name}", default))
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(f"CHATBOT_{name}", default))
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(f"CHATBOT_{name}", default)
+
+# --- SERVIDOR (serve.py) ---
+SERVER_HOST = _env_str("HOST", "0.0.0.0")
+SERVER_PORT = _env_int("PORT", 8000)
+WORKERS = _env_int("WORKERS", 0)  # 0 = un worker por núcleo disponible
+TORCH_THREADS = _env_int("TORCH_THREADS", 0)  # 0 = núcleos / workers
+
+# --- ALMACENAMIENTO DE SESIONES ---
+STORAGE_BACKEND = _env_str("STORAGE", "memory")  # memory | sqlite
+SQLITE_PATH = _env_str("SQLITE_PATH", "chatbot.db")
+# Conversaciones (turnos recientes) en caché por worker con SQLite
+SQLITE_CONVERSATION_CACHE = _env_int("SQLITE_CONVERSATION_CACHE", 10000)
+# Escritura diferida: auto = solo para backends persistentes
+WRITE_BEHIND = _env_str("WRITE_BEHIND", "auto")  # auto | 1 | 0
+WRITE_BEHIND_INTERVAL = _env_float("WRITE_BEHIND_INTERVAL", 0.5)  # segundos
+WRITE_BEHIND_MAX_BATCH = _env_int("WRITE_BEHIND_MAX_BATCH", 256)
+# Mensajes en cola antes de que las peticiones esperen el vaciado (contrapresión)
+WRITE_BEHIND_MAX_QUEUE = _env_int("WRITE_BEHIND_MAX_QUEUE", 10000)
+# Intentos fallidos seguidos tras los que un lote se descarta
+WRITE_BEHIND_MAX_RETRIES = _env_int("WRITE_BEHIND_MAX_RETRIES", 5)
+# Expiración en segundo plano de sesiones inactivas (TTL 0 la desactiva)
+SESSION_TTL = _env_float("SESSION_TTL", 86400.0)  # segundos
+SESSION_EXPIRY_INTERVAL = _env_float("SESSION_EXPIRY_INTERVAL", 30.0)  # segundos
+SESSION_EXPIRY_BATCH = _env_int("SESSION_EXPIRY_BATCH", 256)
+
+# --- CATÁLOGO ---
+# JSON ({marca: {modelo: specs}}) o CSV; se recarga al cambiar el archivo
+CATALOG_PATH = _env_str("CATALOG_PATH", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "catalogo.json"))
+CATALOG_RELOAD_INTERVAL = _env_float("CATALOG_RELOAD_INTERVAL", 2.0)  # segundos (0 desactiva)
+
+# --- FALLBACK GENERATIVO ---
+GENERATIVE_MODEL = _env_str("GENERATIVE_MODEL", "datificate/gpt2-small-spanish")
+GENERATIVE_BACKEND = _env_str("GENERATIVE_BACKEND", "torch")  # torch | torch-int8 | onnx | stub
+GENERATIVE_QUEUE_SIZE = _env_int("GENERATIVE_QUEUE_SIZE", 32)
+GENERATIVE_MAX_BATCH = _env_int("GENERATIVE_MAX_BATCH", 4)
+GENERATIVE_BATCH_WINDOW = _env_float("GENERATIVE_BATCH_WINDOW", 0.015)  # segundos
+GENERATIVE_TIMEOUT = _env_float("GENERATIVE_TIMEOUT", 30.0)  # segundos
+GENERATIVE_MAX_NEW_TOKENS = _env_int("GENERATIVE_MAX_NEW_TOKENS", 50)
+GENERATIVE_PREFIX_CACHE = _env_str("GENERATIVE_PREFIX_CACHE", "1") == "1"
+# Prompts por llamado al modelo en el endpoint por lotes
+GENERATIVE_BULK_BATCH = _env_int("GENERATIVE_BULK_BATCH", 16)
+# Latencia simulada del backend stub: fija por llamado + por token generado
+GENERATIVE_STUB_CALL_LATENCY = _env_float("GENERATIVE_STUB_CALL_LATENCY", 0.02)  # segundos
+GENERATIVE_STUB_TOKEN_LATENCY = _env_float("GENERATIVE_STUB_TOKEN_LATENCY", 0.002)  # segundos
+
+# --- DETECCIÓN DE INTENCIÓN ---
+# Agregar los lemas de spaCy (si ya cargó) a los tokens del mensaje
+INTENT_LEMMATIZE = _env_str("INTENT_LEMMATIZE", "0") == "1"
+
+# Similitud coseno mínima para que el nivel semántico responda con plantilla (>1 lo desactiva)
+SEMANTIC_THRESHOLD = _env_float("SEMANTIC_THRESHOLD", 0.55)
+
+# --- ANÁLISIS NLP (/analyze) ---
+ANALYSIS_CACHE_SIZE = _env_int("ANALYSIS_CACHE_SIZE", 2048)
+ANALYSIS_BATCH_SIZE = _env_int("ANALYSIS_BATCH_SIZE", 64)
+ANALYSIS_N_PROCESS = _env_int("ANALYSIS_N_PROCESS", 1)
+
+# --- ENDPOINT POR LOTES ---
+CHAT_BATCH_MAX = _env_int("CHAT_BATCH_MAX", 1000)
+
+# --- CACHÉ DE RESPUESTAS GENERATIVAS ---
+GENERATIVE_CACHE_SIZE = _env_int("GENERATIVE_CACHE_SIZE", 1024)
+GENERATIVE_CACHE_TTL = _env_float("GENERATIVE_CACHE_TTL", 3600.0)  # segundos
+GENERATIVE_CACHE_LEMMATIZE = _env_str("GENERATIVE_CACHE_LEMMATIZE", "0") == "1"
@@ -0,0 +1,143 @@
+import re
+from typing import Optional
+
+from src.Utils.texto import plegar
+
+# Todos los patrones trabajan sobre el texto plegado (minúsculas, sin acentos)
+_NUMERO = r"(\d{1,3}(?:[.,]\d{3})+|\d+(?:[.,]\d+)?)"
+_MULTIPLO = r"(?:\s*(k|mil)\b)?"
+_MONEDA = r"(?:dolares|dolar|usd|pesos)\b"
+
+# Montos: "$1,200", "1200 dólares", "1.5k usd", "mil dólares" o un número
+# tras una palabra de presupuesto ("hasta 900", "presupuesto de 1000")
+_MONTO = re.compile(
+    r"(?:\$|\busd)\s*" + _NUMERO + _MULTIPLO
+    + r"|" + _NUMERO + _MULTIPLO + r"\s*(?:\$|" + _MONEDA + r")"
+    + r"|\b(mil)\s+" + _MONEDA
+    + r"|(?:presupuesto|hasta|maximo|menos de|no mas de|debajo de|mas de|desde|minimo|arriba de|encima de|entre|tengo)"
+      r"\s+(?:(?:de|es|son|unos|como|los)\s+)*" + _NUMERO + _MULTIPLO + r"(?!\s*(?:gb|tb|g\b|t\b|pulgadas))"
+)
+_ENTRE = re.compile(r"\bentre\b")
+_MINIMO = re.compile(r"\b(?:(?<!no )mas de|desde|minimo|arriba de|encima de|por lo menos|al menos)\s+(?:(?:de|unos)\s+)*\$?\s*$")
+
+# Capacidades: "32gb", "1 tb", "16 gb de ram", "ram de 16"
+_CAPACIDAD = re.compile(r"(\d+(?:[.,]\d+)?)\s*(gb|tb)\b")
+_RAM_SIN_UNIDAD = re.compile(r"\b(?:ram|memoria)\s+(?:de\s+)?(\d+)\b(?!\s*(?:gb|tb))")
+_PALABRAS_RAM = re.compile(r"\b(?:ram|memoria)\b")
+_PALABRAS_ALMACENAMIENTO = re.compile(r"\b(?:ssd|hdd|disco|almacenamiento|espacio)\b")
+_DIGITO = re.compile(r"\d")
+
+# Una capacidad sin contexto desde este valor (GB) se toma como almacenamiento
+MIN_GB_ALMACENAMIENTO = 128
+# Un número tras una palabra de presupuesto, sin moneda, es precio desde este valor
+MIN_MONTO_SIN_MONEDA = 100
+
+
+def _a_numero(texto: str, multiplo: Optional[str] = None) -> float:
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", texto):
+        valor = float(re.sub(r"[.,]", "", texto))
+    else:
+        valor = float(texto.replace(",", "."))
+    return valor * 1000 if multiplo else valor
+
+
+def _a_gb(valor: str, unidad: str) -> int:
+    cantidad = float(valor.replace(",", "."))
+    return int(cantidad * 1024) if unidad == "tb" else int(cantidad)
+
+
+class Requisitos:
+    """Filtros numéricos extraídos de un mensaje (None = sin restricción)"""
+    __slots__ = ("precio_min", "precio_max", "ram_min", "almacenamiento_min")
+
+    def __init__(self, precio_min=None, precio_max=None, ram_min=None, almacenamiento_min=None):
+        self.precio_min = precio_min
+        self.precio_max = precio_max
+        self.ram_min = ram_min
+        self.almacenamiento_min = almacenamiento_min
+
+    def __bool__(self):
+        return any(getattr(self, campo) is not None for campo in self.__slots__)
+
+    def __eq__(self, otro):
+        return isinstance(otro, Requisitos) and all(
+            getattr(self, campo) == getattr(otro, campo) for campo in self.__slots__)
+
+    def __repr__(self):
+        return f"Requisitos({self.clave()})"
+
+    def clave(self) -> str:
+        """Forma compacta para matched_keyword ("precio<=1000,ram>=32")"""
+        partes = []
+        if self.precio_min is not None:
+            partes.append(f"precio>={self.precio_min:g}")
+        if self.precio_max is not None:
+            partes.append(f"precio<={self.precio_max:g}")
+        if self.ram_min is not None:
+            partes.append(f"ram>={self.ram_min}")
+        if self.almacenamiento_min is not None:
+            partes.append(f"almacenamiento>={self.almacenamiento_min}")
+        return ",".join(partes)
+
+
+def _extraer_precios(texto: str, requisitos: Requisitos):
+    montos = []
+    for coincidencia in _MONTO.finditer(texto):
+        grupos = coincidencia.groups()
+        if grupos[4]:
+            numero, valor, con_moneda = 5, 1000.0, True
+        else:
+            numero = next(i for i in (1, 3, 6) if grupos[i - 1])
+            valor, con_moneda = _a_numero(grupos[numero - 1], grupos[numero]), numero != 6
+        if con_moneda or valor >= MIN_MONTO_SIN_MONEDA:
+            montos.append((coincidencia.start(), coincidencia.start(numero), valor))
+    if not montos:
+        return
+    if len(montos) >= 2 and _ENTRE.search(texto[:montos[1][0]]):
+        bajo, alto = sorted((montos[0][2], montos[1][2]))
+        requisitos.precio_min, requisitos.precio_max = bajo, alto
+        return
+    _, inicio, valor = montos[0]
+    if _MINIMO.search(texto[:inicio]):
+        requisitos.precio_min = valor
+    else:
+        # "tengo 1000", "hasta $900", "1000 dólares": el monto es el presupuesto
+        requisitos.precio_max = valor
+
+
+def _extraer_capacidades(texto: str, requisitos: Requisitos):
+    for coincidencia in _CAPACIDAD.finditer(texto):
+        gb = _a_gb(coincidencia.group(1), coincidencia.group(2))
+        # El contexto de cada cifra termina donde empieza la siguiente
+        despues = _DIGITO.split(texto[coincidencia.end():coincidencia.end() + 20])[0]
+        antes = _DIGITO.split(texto[max(0, coincidencia.start() - 20):coincidencia.start()])[-1]
+        if coincidencia.group(2) == "tb" or _PALABRAS_ALMACENAMIENTO.search(despues):
+            es_ram = False
+        elif _PALABRAS_RAM.search(despues) or _PALABRAS_RAM.search(antes):
+            es_ram = True
+        elif _PALABRAS_ALMACENAMIENTO.search(antes):
+            es_ram = False
+        else:
+            es_ram = gb < MIN_GB_ALMACENAMIENTO
+        if es_ram:
+            requisitos.ram_min = max(requisitos.ram_min or 0, gb)
+        else:
+            requisitos.almacenamiento_min = max(requisitos.almacenamiento_min or 0, gb)
+    if requisitos.ram_min is None:
+        coincidencia = _RAM_SIN_UNIDAD.search(texto)
+        if coincidencia:
+            requisitos.ram_min = int(coincidencia.group(1))
+
+
+def extraer_requisitos(mensaje: str) -> Requisitos:
+    """
+    Presupuesto (máximo, mínimo o rango) y mínimos de RAM y almacenamiento
+    mencionados en el mensaje. Los números de modelo ("XPS 13", "RTX 3070")
+    no cuentan: un precio necesita moneda o una palabra de presupuesto y una
+    capacidad necesita su unidad (GB/TB) o la palabra RAM.
+    """
+    texto = plegar(mensaje)
+    requisitos = Requisitos()
+    _extraer_precios(texto, requisitos)
+    _extraer_capacidades(texto, requisitos)
+    return requisitos
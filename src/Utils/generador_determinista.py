@@ -0,0 +1,91 @@
+"""
+Generador determinista con la misma interfaz que el pipeline de transformers
+(backend ``stub``): sin red, sin GPU y sin pesos. Sirve para benchmarks y
+pruebas de carga; la respuesta depende solo del prompt y la latencia se
+simula como un llamado al modelo (costo fijo + costo por paso de decodificación).
+"""
+import time
+import zlib
+from typing import List
+
+import numpy as np
+
+# Modelos y datos tomados de data/catalogo.json
+RESPUESTAS = [
+    "Para programar te recomiendo la Lenovo ThinkPad X1 Carbon con 32GB de RAM y 1TB SSD.",
+    "La HP Pavilion es una buena opción para estudiar y cuesta $600.",
+    "Si buscas potencia, la Dell XPS 13 tiene 16GB de RAM, 1TB SSD y pantalla 4K.",
+    "Para gaming la Dell Alienware M15 con RTX 3070 es la más completa del catálogo.",
+    "Si viajas mucho, la HP Envy 13 es liviana y tiene pantalla táctil.",
+    "Con ese presupuesto la Lenovo IdeaPad 5 ofrece el mejor equilibrio.",
+]
+
+
+class TokenizadorDeterminista:
+    """
+    Vocabulario cerrado de palabras (una palabra = un token, con su espacio
+    inicial como en GPT-2, así cada token decodifica por separado); 0 es EOS.
+    """
+
+    name_or_path = "stub"
+
+    def __init__(self, textos: List[str]):
+        self.vocabulario = ["<|endoftext|>"] + sorted({" " + p for t in textos for p in t.split()})
+        self.ids = {palabra: i for i, palabra in enumerate(self.vocabulario)}
+        self.eos_token_id = 0
+        self.pad_token_id = 0
+        self.padding_side = "left"
+
+    def __len__(self):
+        return len(self.vocabulario)
+
+    def encode(self, texto: str, **kwargs) -> List[int]:
+        return [self.ids[" " + p] for p in texto.split() if " " + p in self.ids]
+
+    def decode(self, ids, skip_special_tokens: bool = False, **kwargs) -> str:
+        ids = ids.tolist() if hasattr(ids, "tolist") else ids
+        if isinstance(ids, int):
+            ids = [ids]
+        return "".join(self.vocabulario[i] for i in ids
+                        if not (skip_special_tokens and i == self.eos_token_id))
+
+    def batch_decode(self, secuencias, **kwargs) -> List[str]:
+        return [self.decode(ids, **kwargs) for ids in secuencias]
+
+
+class GeneradorDeterminista:
+    """
+    `generador(prompts, **kwargs)` -> [[{"generated_text": ...}], ...]. Un
+    llamado con N prompts cuesta `latencia_llamado + latencia_token * pasos`,
+    con `pasos` = tokens de la respuesta más larga del lote, como la
+    decodificación por lotes. Con `streamer` emite los tokens uno a uno.
+    """
+
+    model = None  # sin caché de prefijo
+
+    def __init__(self, latencia_llamado: float = 0.02, latencia_token: float = 0.002,
+                 respuestas: List[str] = RESPUESTAS):
+        self.respuestas = list(respuestas)
+        self.tokenizer = TokenizadorDeterminista(self.respuestas)
+        self.latencia_llamado = latencia_llamado
+        self.latencia_token = latencia_token
+
+    def responder(self, prompt: str) -> str:
+        return self.respuestas[zlib.crc32(prompt.encode()) % len(self.respuestas)]
+
+    def __call__(self, prompts, max_new_tokens: int = 50, streamer=None, **kwargs):
+        unico = isinstance(prompts, str)
+        textos = [self.responder(p) for p in ([prompts] if unico else prompts)]
+        tokens = [self.tokenizer.encode(t)[:max_new_tokens] for t in textos]
+        if self.latencia_llamado:
+            time.sleep(self.latencia_llamado)
+        if streamer is not None:
+            streamer.put(np.array([[self.tokenizer.eos_token_id]]))  # el prompt (se omite)
+            for token_id in tokens[0]:
+                if self.latencia_token:
+                    time.sleep(self.latencia_token)
+                streamer.put(np.array([token_id]))
+        elif self.latencia_token:
+            time.sleep(self.latencia_token * max(len(t) for t in tokens))
+        salidas = [[{"generated_text": self.tokenizer.decode(t)}] for t in tokens]
+        return salidas[0] if unico else salidas
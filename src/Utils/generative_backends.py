@@ -0,0 +1,85 @@
+"""
+Backends de inferencia para el modelo generativo.
+
+Todos devuelven un pipeline de ``text-generation`` de transformers, así que el
+contrato ``GENERADOR(prompts, **kwargs)`` y ``GENERADOR.tokenizer`` no cambia:
+
+- ``torch``: pesos fp32 (comportamiento original).
+- ``torch-int8``: cuantización dinámica int8 de las capas lineales.
+- ``onnx``: sesión de ONNX Runtime exportada con ``optimum`` (dependencia opcional).
+- ``stub``: generador determinista sin modelo (benchmarks y pruebas sin red ni GPU).
+"""
+
+BACKENDS = ("torch", "torch-int8", "onnx", "stub")
+
+# Backends cuyo modelo acepta past_key_values de torch en generate()
+BACKENDS_CON_CACHE_PREFIJO = ("torch", "torch-int8")
+
+# Backends que no importan transformers ni torch (sin set_seed, streamer ni criterios de parada)
+BACKENDS_SIN_TRANSFORMERS = ("stub",)
+
+
+def _conv1d_a_linear(model):
+    """
+    GPT-2 usa Conv1D (pesos transpuestos) en lugar de nn.Linear, y la
+    cuantización dinámica solo reconoce nn.Linear: se reemplazan antes.
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                nx, nf = child.weight.shape
+                linear = torch.nn.Linear(nx, nf)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+    return model
+
+
+def _pipeline_torch(model_id: str):
+    from transformers import pipeline
+    return pipeline('text-generation', model=model_id)
+
+
+def _pipeline_torch_int8(model_id: str):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32)
+    model.eval()
+    model = _conv1d_a_linear(model)
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline('text-generation', model=model, tokenizer=tokenizer)
+
+
+def _pipeline_onnx(model_id: str):
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM
+    except ImportError as e:
+        raise RuntimeError("El backend 'onnx' requiere: pip install optimum[onnxruntime]") from e
+    from transformers import AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = ORTModelForCausalLM.from_pretrained(model_id, export=True, use_cache=True)
+    return pipeline('text-generation', model=model, tokenizer=tokenizer)
+
+
+def _pipeline_stub(model_id: str):
+    from src.Utils.config import GENERATIVE_STUB_CALL_LATENCY, GENERATIVE_STUB_TOKEN_LATENCY
+    from src.Utils.generador_determinista import GeneradorDeterminista
+    return GeneradorDeterminista(GENERATIVE_STUB_CALL_LATENCY, GENERATIVE_STUB_TOKEN_LATENCY)
+
+
+def construir_generador(backend: str, model_id: str):
+    constructores = {
+        "torch": _pipeline_torch,
+        "torch-int8": _pipeline_torch_int8,
+        "onnx": _pipeline_onnx,
+        "stub": _pipeline_stub,
+    }
+    if backend not in constructores:
+        raise ValueError(f"Backend generativo desconocido '{backend}'. Opciones: {', '.join(BACKENDS)}")
+    return constructores[backend](model_id)
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from src.Utils.metrics import METRICS
+
+_STOP = object()
+# Tipos de elemento en la cola: (prompts | fn, futuro, modo)
+_SINGLE, _MANY, _CALL = "single", "many", "call"
+
+class GenerativePool:
+    """
+    Hilo dedicado para el modelo generativo con cola acotada.
+    Agrupa los prompts que llegan dentro de una ventana corta en un solo
+    llamado al pipeline; si la cola está llena, submit devuelve None para
+    que el llamador responda con una plantilla. submit_many encola varios
+    prompts como un solo elemento que siempre viaja en el mismo llamado.
+    """
+
+    def __init__(self, generate_batch: Callable[[List[str]], List[str]],
+                 max_queue: int = 32, max_batch: int = 4, batch_window: float = 0.015):
+        self.generate_batch = generate_batch
+        self.max_batch = max(1, max_batch)
+        self.batch_window = batch_window
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pool-generativo", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def submit(self, prompt: str) -> Optional[Future]:
+        return self._put((prompt,), _SINGLE)
+
+    def submit_many(self, prompts: List[str]) -> Optional[Future]:
+        """El futuro devuelve la lista de salidas en el mismo orden"""
+        return self._put(tuple(prompts), _MANY)
+
+    def submit_call(self, fn: Callable[[], object]) -> Optional[Future]:
+        """Ejecuta fn en el hilo del modelo, sola (p. ej. una generación con streaming)"""
+        return self._put(fn, _CALL)
+
+    def _put(self, payload, mode: str) -> Optional[Future]:
+        self.start()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((payload, future, mode))
+        except queue.Full:
+            METRICS.increment("generative_shed", 1 if mode == _CALL else len(payload))
+            return None
+        METRICS.set_gauge("generative_queue_depth", self._queue.qsize())
+        return future
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _collect_batch(self, first) -> tuple:
+        """Devuelve (lote, stop, elemento aplazado): una llamada encontrada cierra el lote"""
+        batch = [first]
+        prompts = len(first[0])
+        deadline = time.perf_counter() + self.batch_window
+        # Un bloque de submit_many que ya alcanza max_batch viaja solo
+        while prompts < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True, None
+            if item[2] == _CALL:
+                return batch, False, item
+            batch.append(item)
+            prompts += len(item[0])
+        return batch, False, None
+
+    def _run_call(self, fn, future: Future):
+        if not future.set_running_or_notify_cancel():
+            return
+        METRICS.increment("generative_calls")
+        try:
+            with METRICS.timer("generative_call"):
+                future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    def _run(self):
+        stop = False
+        deferred = None
+        while not stop:
+            if deferred is not None:
+                item, deferred = deferred, None
+            else:
+                item = self._queue.get()
+            if item is _STOP:
+                break
+            if item[2] == _CALL:
+                self._run_call(item[0], item[1])
+                continue
+            batch, stop, deferred = self._collect_batch(item)
+            METRICS.set_gauge("generative_queue_depth", self._queue.qsize())
+
+            # Descartar peticiones cuyo llamador ya abandonó la espera
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            prompts = [prompt for entry in batch for prompt in entry[0]]
+            METRICS.increment("generative_batches")
+            METRICS.increment("generative_prompts", len(prompts))
+            try:
+                with METRICS.timer("generative_batch"):
+                    outputs = self.generate_batch(prompts)
+                start = 0
+                for entry_prompts, future, mode in batch:
+                    chunk = outputs[start:start + len(entry_prompts)]
+                    start += len(entry_prompts)
+                    future.set_result(chunk[0] if mode == _SINGLE else chunk)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
@@ -0,0 +1,135 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Límites de los buckets en segundos (estilo Prometheus)
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class Histogram:
+    """Histograma acumulativo de latencias con buckets fijos"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimación del cuantil por interpolación lineal dentro del bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return None
+        target = q * total
+        accumulated = 0
+        for i, c in enumerate(counts):
+            if accumulated + c >= target and c > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * ((target - accumulated) / c)
+            accumulated += c
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, total = self.count, self.sum
+        p = {q: self.quantile(q) for q in (0.50, 0.95, 0.99)}
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "avg": round(total / count, 6) if count else None,
+            "p50": round(p[0.50], 6) if count else None,
+            "p95": round(p[0.95], 6) if count else None,
+            "p99": round(p[0.99], 6) if count else None,
+        }
+
+class StageMetrics:
+    """Registro de histogramas por etapa del procesamiento del chat"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(stage, Histogram())
+        return hist
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).observe(seconds)
+
+    def increment(self, event: str, amount: int = 1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + amount
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        return {stage: hist.snapshot() for stage, hist in list(self.histograms.items())}
+
+    def counters_snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+    def gauges_snapshot(self) -> dict:
+        return dict(self.gauges)
+
+    def render_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus"""
+        name = "chatbot_stage_duration_seconds"
+        lines: List[str] = [
+            f"# HELP {name} Duración de cada etapa del procesamiento del chat",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, hist in list(self.histograms.items()):
+            with hist._lock:
+                counts = list(hist.counts)
+                count, total = hist.count, hist.sum
+            accumulated = 0
+            for bound, c in zip(hist.buckets, counts):
+                accumulated += c
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {accumulated}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        lines.append("# HELP chatbot_events_total Eventos contados por el chatbot")
+        lines.append("# TYPE chatbot_events_total counter")
+        for event, value in self.counters_snapshot().items():
+            lines.append(f'chatbot_events_total{{event="{event}"}} {value}')
+
+        lines.append("# HELP chatbot_gauge Valores instantáneos del chatbot")
+        lines.append("# TYPE chatbot_gauge gauge")
+        for gauge, value in self.gauges_snapshot().items():
+            lines.append(f'chatbot_gauge{{name="{gauge}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+# Registro global compartido por utilidades, servicio y controlador
+METRICS = StageMetrics()
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Optional
+
+from src.Utils.config import GENERATIVE_BACKEND, GENERATIVE_MODEL
+from src.Utils.generative_backends import (
+    BACKENDS_CON_CACHE_PREFIJO,
+    BACKENDS_SIN_TRANSFORMERS,
+    construir_generador,
+)
+
+# --- ESTADO DE LOS MODELOS ---
+# Nada se carga al importar: los modelos se cargan en un hilo de precarga
+# lanzado en el arranque de la app, o bajo demanda en el primer uso.
+_MODELOS = {"pln": None, "generador": None}
+_ESTADO = {
+    "precarga_iniciada": False,
+    "precarga_terminada": False,
+    "nltk": False,
+    "pln": False,
+    "generador": False,
+    "errores": {},
+    "inicio": None,
+    "duracion": None,
+}
+_LOCKS = {"pln": threading.Lock(), "generador": threading.Lock(), "precarga": threading.Lock()}
+
+
+def descargar_recursos_nltk():
+    if _ESTADO["nltk"]:
+        return
+    import nltk
+    try:
+        nltk.download('punkt_tab', quiet=True)
+    except Exception:
+        nltk.download('punkt', quiet=True)
+    _ESTADO["nltk"] = True
+
+
+def cargar_pln(descargar: bool = False):
+    """
+    Carga spaCy una sola vez (bloqueante). Solo la precarga pasa `descargar`
+    para bajar el modelo si no existe; un fallo queda registrado y los
+    llamados siguientes fallan de inmediato sin reintentar.
+    """
+    if _MODELOS["pln"] is not None:
+        return _MODELOS["pln"]
+    with _LOCKS["pln"]:
+        if _MODELOS["pln"] is None:
+            # La precarga reintenta una vez con descarga aunque un uso previo haya fallado
+            if "pln" in _ESTADO["errores"] and not descargar:
+                raise RuntimeError(f"spaCy no disponible: {_ESTADO['errores']['pln']}")
+            try:
+                import spacy
+                try:
+                    pln = spacy.load("es_core_news_sm")
+                except OSError:
+                    if not descargar:
+                        raise
+                    import subprocess, sys
+                    subprocess.check_call([sys.executable, "-m", "spacy", "download", "es_core_news_sm"])
+                    pln = spacy.load("es_core_news_sm")
+            except Exception as e:
+                _ESTADO["errores"]["pln"] = str(e)
+                raise RuntimeError(f"spaCy no disponible: {e}") from e
+            _MODELOS["pln"] = pln
+            _ESTADO["pln"] = True
+            _ESTADO["errores"].pop("pln", None)
+    return _MODELOS["pln"]
+
+
+def cargar_modelo_generativo():
+    """Carga el pipeline GPT-2 una sola vez (bloqueante); None si falla"""
+    if _ESTADO["generador"] or "generador" in _ESTADO["errores"]:
+        return _MODELOS["generador"]
+    with _LOCKS["generador"]:
+        if not _ESTADO["generador"] and "generador" not in _ESTADO["errores"]:
+            try:
+                generator = construir_generador(GENERATIVE_BACKEND, GENERATIVE_MODEL)
+                # GPT-2 no tiene token de padding; se reutiliza EOS y se rellena
+                # a la izquierda para poder generar en lotes
+                generator.tokenizer.pad_token_id = generator.tokenizer.eos_token_id
+                generator.tokenizer.padding_side = "left"
+                if usa_transformers():
+                    from transformers import set_seed
+                    set_seed(42)
+                _MODELOS["generador"] = generator
+                _ESTADO["generador"] = True
+            except Exception as e:
+                print(f"Error al cargar modelo: {e}")
+                _ESTADO["errores"]["generador"] = str(e)
+    return _MODELOS["generador"]
+
+
+def soporta_cache_prefijo() -> bool:
+    return GENERATIVE_BACKEND in BACKENDS_CON_CACHE_PREFIJO
+
+
+def usa_transformers() -> bool:
+    return GENERATIVE_BACKEND not in BACKENDS_SIN_TRANSFORMERS
+
+
+def obtener_pln():
+    """spaCy listo para usar; lo carga en este hilo si la precarga no terminó (sin descargarlo)"""
+    return _MODELOS["pln"] or cargar_pln()
+
+
+def obtener_pln_si_listo():
+    """spaCy si ya terminó de cargar; None mientras tanto (no bloquea)"""
+    return _MODELOS["pln"]
+
+
+def obtener_generador():
+    """Generador si ya terminó de cargar; None mientras tanto (no bloquea)"""
+    return _MODELOS["generador"]
+
+
+def precargar_modelos():
+    _ESTADO["inicio"] = time.time()
+    for nombre, cargar in (("nltk", descargar_recursos_nltk),
+                           ("pln", lambda: cargar_pln(descargar=True)),
+                           ("generador", cargar_modelo_generativo)):
+        try:
+            cargar()
+        except Exception as e:
+            print(f"Error en precarga de {nombre}: {e}")
+            _ESTADO["errores"].setdefault(nombre, str(e))
+    _ESTADO["duracion"] = time.time() - _ESTADO["inicio"]
+    _ESTADO["precarga_terminada"] = True
+
+
+def iniciar_precarga() -> Optional[threading.Thread]:
+    """Lanza la precarga en segundo plano (una sola vez por proceso)"""
+    with _LOCKS["precarga"]:
+        if _ESTADO["precarga_iniciada"]:
+            return None
+        _ESTADO["precarga_iniciada"] = True
+    hilo = threading.Thread(target=precargar_modelos, name="precarga-modelos", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def estado_modelos() -> dict:
+    return {
+        "nlp_loaded": _ESTADO["pln"],
+        "generative_loaded": _ESTADO["generador"],
+        "generative_backend": GENERATIVE_BACKEND,
+        "warmup_started": _ESTADO["precarga_iniciada"],
+        "warmup_finished": _ESTADO["precarga_terminada"],
+        "warmup_seconds": _ESTADO["duracion"],
+        "errors": dict(_ESTADO["errores"]),
+    }
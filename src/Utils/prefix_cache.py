@@ -0,0 +1,68 @@
+import threading
+from typing import List, Optional, Tuple
+
+from src.Utils.metrics import METRICS
+
+class PrefixKVCache:
+    """
+    Guarda los past_key_values del prefijo fijo del prompt (reglas + catálogo).
+    El prefijo se codifica una vez por versión del catálogo; cada petición
+    solo codifica y atiende sobre el sufijo del usuario.
+    """
+
+    def __init__(self):
+        self._entry: Optional[Tuple[int, str, object, tuple]] = None
+        self._lock = threading.Lock()
+
+    def get(self, model, tokenizer, prefix: str, version: int):
+        entry = self._entry
+        if entry is not None and entry[0] == version and entry[1] == prefix:
+            METRICS.increment("prefix_cache_hit")
+            return entry[2], entry[3]
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != version or entry[1] != prefix:
+                import torch
+                METRICS.increment("prefix_cache_miss")
+                with METRICS.timer("prefix_encoding"), torch.no_grad():
+                    ids = tokenizer(prefix, return_tensors="pt").input_ids.to(model.device)
+                    past = model(ids, use_cache=True).past_key_values
+                entry = self._entry = (version, prefix, ids, past)
+            return entry[2], entry[3]
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+    def generate(self, model, tokenizer, prefix: str, suffixes: List[str], version: int,
+                 **generate_kwargs) -> List[str]:
+        """
+        Genera para varios sufijos reutilizando la caché del prefijo. Los sufijos
+        se rellenan a la izquierda, es decir, entre prefijo y sufijo; la máscara
+        de atención los excluye y GPT-2 deriva las posiciones de esa máscara.
+        """
+        import torch
+        prefix_ids, past = self.get(model, tokenizer, prefix, version)
+        batch = len(suffixes)
+
+        encoded = [tokenizer(s, add_special_tokens=False).input_ids for s in suffixes]
+        width = max(len(ids) for ids in encoded)
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        suffix_ids = torch.tensor([[pad_id] * (width - len(ids)) + ids for ids in encoded],
+                                  dtype=torch.long, device=model.device)
+        suffix_mask = torch.tensor([[0] * (width - len(ids)) + [1] * len(ids) for ids in encoded],
+                                   dtype=torch.long, device=model.device)
+
+        input_ids = torch.cat([prefix_ids.expand(batch, -1), suffix_ids], dim=1)
+        attention_mask = torch.cat([torch.ones_like(prefix_ids).expand(batch, -1), suffix_mask], dim=1)
+        batch_past = tuple((k.expand(batch, -1, -1, -1), v.expand(batch, -1, -1, -1)) for k, v in past)
+
+        with torch.no_grad():
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                past_key_values=batch_past,
+                **generate_kwargs
+            )
+        new_tokens = output[:, input_ids.shape[1]:]
+        return tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
@@ -0,0 +1,62 @@
+import zlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.Utils.texto import tokenizar
+
+def _rasgos(tokens: Sequence[str]) -> List[str]:
+    """Cada palabra y sus n-gramas de 3 y 4 caracteres (con bordes): tolera flexiones y errores"""
+    rasgos = []
+    for token in tokens:
+        rasgos.append("w:" + token)
+        marcado = f"<{token}>"
+        for n in (3, 4):
+            rasgos.extend(marcado[i:i + n] for i in range(len(marcado) - n + 1))
+    return rasgos
+
+
+class ClasificadorSemantico:
+    """
+    Clasificador por similitud coseno contra frases de ejemplo por intención.
+    Las frases se vectorizan al iniciar con n-gramas de caracteres hasheados
+    y ponderados por IDF (matriz E x D normalizada); clasificar un mensaje es
+    un producto matriz-vector y un máximo por intención.
+    """
+
+    def __init__(self, ejemplos: Dict[str, List[str]], dimension: int = 4096):
+        self.dimension = dimension
+        self.intenciones: List[str] = []
+        frases: List[List[str]] = []
+        for intencion, lista in ejemplos.items():
+            for frase in lista:
+                self.intenciones.append(intencion)
+                frases.append(tokenizar(frase))
+
+        conteos = np.stack([self._conteos(tokens) for tokens in frases]) if frases \
+            else np.zeros((0, dimension), dtype=np.float32)
+        documentos = (conteos > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(frases)) / (1 + documentos)) + 1).astype(np.float32)
+        self.matriz = self._normalizar(np.log1p(conteos) * self.idf)
+
+    def _conteos(self, tokens: Sequence[str]) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for rasgo in _rasgos(tokens):
+            vector[zlib.crc32(rasgo.encode()) % self.dimension] += 1
+        return vector
+
+    @staticmethod
+    def _normalizar(matriz: np.ndarray) -> np.ndarray:
+        normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+        return matriz / np.where(normas == 0, 1, normas)
+
+    def vectorizar(self, tokens: Sequence[str]) -> np.ndarray:
+        return self._normalizar(np.log1p(self._conteos(tokens)) * self.idf)
+
+    def clasificar(self, tokens: Sequence[str]) -> Tuple[str, float]:
+        """Intención del ejemplo más parecido y su similitud coseno ("desconocido", 0.0 si no hay ejemplos)"""
+        if not tokens or not self.intenciones:
+            return "desconocido", 0.0
+        similitudes = self.matriz @ self.vectorizar(tokens)
+        mejor = int(similitudes.argmax())
+        return self.intenciones[mejor], float(similitudes[mejor])
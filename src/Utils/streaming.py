@@ -0,0 +1,147 @@
+import queue
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+# Mismo corte que postprocesar_generacion: la respuesta es la primera oración
+FIN_ORACION = re.compile(r'[.!?]\s*|\n')
+
+_TABLAS: Dict[Tuple[str, int], tuple] = {}
+_TABLAS_LOCK = threading.Lock()
+
+def _tablas_fin_oracion(tokenizer) -> tuple:
+    """
+    Clasifica el vocabulario una vez por tokenizer: tokens con . ! ? (cortan
+    siempre), saltos de línea precedidos de texto, saltos de línea sueltos y
+    tokens con contenido visible.
+    """
+    clave = (getattr(tokenizer, "name_or_path", ""), len(tokenizer))
+    tablas = _TABLAS.get(clave)
+    if tablas is not None:
+        return tablas
+    with _TABLAS_LOCK:
+        if clave not in _TABLAS:
+            corta, salto_tras_texto, salto, contenido = set(), set(), set(), set()
+            textos = tokenizer.batch_decode([[i] for i in range(len(tokenizer))])
+            for token_id, texto in enumerate(textos):
+                if any(c in texto for c in ".!?"):
+                    corta.add(token_id)
+                if "\n" in texto:
+                    salto.add(token_id)
+                    if texto.split("\n", 1)[0].strip():
+                        salto_tras_texto.add(token_id)
+                if texto.strip():
+                    contenido.add(token_id)
+            _TABLAS[clave] = (frozenset(corta), frozenset(salto_tras_texto), frozenset(salto), frozenset(contenido))
+        return _TABLAS[clave]
+
+
+class CorteFinOracion:
+    """
+    Criterio de parada por fila: termina la generación en el primer fin de
+    oración, porque postprocesar_generacion descarta todo lo que sigue. Un
+    salto de línea antes de cualquier texto no corta (strip() lo elimina).
+    `cancelado` detiene todas las filas, p. ej. si el cliente se desconecta.
+    """
+
+    def __init__(self, tokenizer, cancelado: Optional[threading.Event] = None):
+        self.tablas = _tablas_fin_oracion(tokenizer)
+        self.cancelado = cancelado
+        self.con_contenido = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+        corta, salto_tras_texto, salto, contenido = self.tablas
+        ultimos = input_ids[:, -1].tolist()
+        if self.con_contenido is None:
+            self.con_contenido = [False] * len(ultimos)
+        if self.cancelado is not None and self.cancelado.is_set():
+            parar = [True] * len(ultimos)
+        else:
+            parar = []
+            for fila, token in enumerate(ultimos):
+                parar.append(token in corta or token in salto_tras_texto
+                             or (token in salto and self.con_contenido[fila]))
+                if token in contenido:
+                    self.con_contenido[fila] = True
+        return torch.tensor(parar, dtype=torch.bool, device=input_ids.device)
+
+
+def criterios_fin_oracion(tokenizer, cancelado: Optional[threading.Event] = None):
+    from transformers import StoppingCriteriaList
+    return StoppingCriteriaList([CorteFinOracion(tokenizer, cancelado)])
+
+
+class StreamerTokens:
+    """
+    Equivalente mínimo de TextIteratorStreamer para generadores sin
+    transformers (backend stub): cada token se decodifica por separado y el
+    iterador lanza queue.Empty si pasan `timeout` segundos sin texto.
+    """
+
+    _FIN = object()
+
+    def __init__(self, tokenizer, skip_prompt: bool = False, timeout: Optional[float] = None,
+                 **opciones_decodificacion):
+        self.tokenizer = tokenizer
+        self.skip_prompt = skip_prompt
+        self.timeout = timeout
+        self.opciones_decodificacion = opciones_decodificacion
+        self._cola: queue.Queue = queue.Queue()
+        self._con_prompt = skip_prompt
+
+    def put(self, ids):
+        if self._con_prompt:
+            self._con_prompt = False
+            return
+        ids = ids.tolist() if hasattr(ids, "tolist") else ids
+        for token_id in ids if isinstance(ids, list) else [ids]:
+            texto = self.tokenizer.decode(token_id, **self.opciones_decodificacion)
+            if texto:
+                self._cola.put(texto)
+
+    def end(self):
+        self._cola.put(self._FIN)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        texto = self._cola.get(timeout=self.timeout)
+        if texto is self._FIN:
+            raise StopIteration
+        return texto
+
+
+class FragmentadorRespuesta:
+    """
+    Convierte el texto que va generando el modelo en fragmentos de la
+    respuesta final: solo la primera oración, ya capitalizada como la deja
+    postprocesar_generacion. No emite nada hasta tener `minimo` caracteres,
+    porque una oración más corta se reemplaza por el catálogo.
+    """
+
+    def __init__(self, minimo: int = 10):
+        self.minimo = minimo
+        self.texto = ""
+        self.emitido = ""
+
+    def agregar(self, fragmento: str) -> str:
+        self.texto += fragmento
+        oracion = FIN_ORACION.split(self.texto.strip())[0].strip()
+        if len(oracion) < self.minimo:
+            return ""
+        visible = oracion.capitalize()
+        if not visible.startswith(self.emitido):
+            return ""
+        nuevo = visible[len(self.emitido):]
+        self.emitido = visible
+        return nuevo
+
+    def finalizar(self, respuesta: str) -> str:
+        """Lo que falta para completar la respuesta final ("" si ya no es un prefijo)"""
+        if not respuesta.startswith(self.emitido):
+            return ""
+        resto = respuesta[len(self.emitido):]
+        self.emitido = respuesta
+        return resto
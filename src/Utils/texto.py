@@ -0,0 +1,14 @@
+import re
+import unicodedata
+from typing import List
+
+_PALABRA = re.compile(r"\w+")
+
+def plegar(texto: str) -> str:
+    """Minúsculas y sin acentos ("Cuánto" -> "cuanto")"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokens plegados, sin puntuación"""
+    return _PALABRA.findall(plegar(texto))